@@ -0,0 +1,128 @@
+from kivy.uix.widget import Widget
+from kivy.clock import Clock
+from kivy.graphics import RenderContext, Color, Rectangle
+from instrument import profiler, log
+
+BACKGROUND_SCOPE = profiler.scope('background')
+# Grey cycle of the menu screens.
+DEFAULT_PALETTE = [
+    [0.2, 0.2, 0.2, 1],
+    [0.3, 0.3, 0.3, 1],
+    [0.4, 0.4, 0.4, 1]
+]
+# `time` restarts after this many seconds so the float uniform keeps its
+# precision on GLES devices; one seam per hour of a screen being shown.
+TIME_WRAP = 3600.0
+
+# --- LAYER ---
+# One hill silhouette: `height` and `amplitude` are fractions of the widget
+# height, `wavelength` is in pixels, `speed` in pixels per second and the
+# colour is the cycling base colour times `shade`.
+class Layer(object):
+    __slots__ = ('speed', 'height', 'amplitude', 'wavelength', 'shade')
+    def __init__(self, speed, height, amplitude, wavelength, shade):
+        self.speed = speed
+        self.height = height
+        self.amplitude = amplitude
+        self.wavelength = wavelength
+        self.shade = shade
+
+# Back to front; nearer layers are lower, darker and faster.
+MENU_LAYERS = [
+    Layer(8, 0.45, 0.06, 700, 0.85),
+    Layer(20, 0.30, 0.05, 420, 0.7),
+]
+GAME_LAYERS = [
+    Layer(15, 0.55, 0.08, 900, 0.9),
+    Layer(40, 0.40, 0.06, 520, 0.78),
+    Layer(90, 0.25, 0.04, 300, 0.65),
+]
+
+FALLBACK_FS = """$HEADER$
+void main(void) {
+    gl_FragColor = frag_color;
+}
+"""
+
+def _vec4(color):
+    return "vec4(%s)" % ", ".join("%.4f" % float(c) for c in color)
+
+def build_shader(palette, duration, layers):
+    # Palette and layers are baked into the source as constants, so a frame
+    # costs one uniform whatever the number of layers.
+    lines = ["$HEADER$",
+             "uniform float time;",
+             "uniform vec2 size;",
+             "vec4 palette(float i) {"]
+    for k, color in enumerate(palette[:-1]):
+        lines.append(f"    if (i < {k + 0.5:.1f}) return {_vec4(color)};")
+    lines.append(f"    return {_vec4(palette[-1])};")
+    lines.append("}")
+    n = float(len(palette))
+    lines += ["void main(void) {",
+              # Linear fade from each palette colour to the next, as the
+              # Animation-driven background did.
+              f"    float t = time / {float(duration):.4f};",
+              f"    float i = mod(floor(t), {n:.1f});",
+              f"    vec4 base = mix(palette(i), palette(mod(i + 1.0, {n:.1f})), fract(t));",
+              "    vec2 p = tex_coord0 * size;",
+              "    vec4 color = base;"]
+    for layer in layers:
+        k = 6.2831853 / layer.wavelength
+        lines.append(f"    if (p.y < size.y * ({layer.height:.4f} + {layer.amplitude:.4f}"
+                     f" * (0.7 * sin((p.x + time * {float(layer.speed):.4f}) * {k:.6f})"
+                     f" + 0.3 * sin((p.x + time * {float(layer.speed):.4f}) * {2.7 * k:.6f}))))"
+                     f" color = vec4(base.rgb * {layer.shade:.4f}, 1.0);")
+    lines += ["    gl_FragColor = color;", "}"]
+    return "\n".join(lines)
+
+# --- PARALLAX BACKGROUND ---
+# Full-screen background with a cycling colour and parallax hill layers,
+# all computed in a fragment shader. Per frame the Python side only
+# advances the `time` uniform; pausing stops the clock event.
+class ParallaxBackground(Widget):
+    def __init__(self, palette=None, duration=10, layers=MENU_LAYERS, **kwargs):
+        self.canvas = RenderContext(use_parent_projection=True, use_parent_modelview=True,
+                                    use_parent_frag_modelview=True)
+        super(ParallaxBackground, self).__init__(**kwargs)
+        self.palette = palette or DEFAULT_PALETTE
+        self.duration = duration
+        self.layers = layers
+        self.time = 0.0
+        shader = self.canvas.shader
+        shader.fs = build_shader(self.palette, duration, layers)
+        with self.canvas:
+            self.bg_color = Color(1, 1, 1, 1)
+            self.bg_rect = Rectangle(pos=self.pos, size=self.size)
+        if not shader.success:
+            # No shader support: a plain first palette colour.
+            log.warning("Runner: Background shader failed to compile, using a flat colour")
+            shader.fs = FALLBACK_FS
+            self.bg_color.rgba = self.palette[0]
+        self.canvas['time'] = 0.0
+        self._update_rect()
+        self.bind(pos=self._update_rect, size=self._update_rect)
+        self.event = None
+        self.paused = True
+        self.resume()
+    def _update_rect(self, *args):
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
+        self.canvas['size'] = (float(self.width), float(self.height))
+    def _tick(self, dt):
+        with BACKGROUND_SCOPE:
+            self.time = (self.time + dt) % TIME_WRAP
+            self.canvas['time'] = self.time
+    def pause(self):
+        if self.paused:
+            return
+        self.paused = True
+        if self.event is not None:
+            self.event.cancel()
+            self.event = None
+    def resume(self):
+        if not self.paused:
+            return
+        self.paused = False
+        # Carries on from the same time, so colours and layers do not jump.
+        self.event = Clock.schedule_interval(self._tick, 0)
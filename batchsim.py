@@ -0,0 +1,499 @@
+import sys
+import copy
+import json
+import time
+import argparse
+from bisect import bisect_left
+
+import numpy as np
+
+from simulation import Simulation, TICK_RATE
+from chunks import ChunkGenerator, OBSTACLE, COIN
+from registry import load_registry
+
+# Batch simulator for balancing and training: N independent games stepped
+# together with NumPy, following the rules of Simulation.step() exactly.
+#
+#   python batchsim.py run --games 100000 --seconds 60 --policy reactive
+#   python batchsim.py run --games 100000 --processes 8 --set gravity=-0.6
+#   python batchsim.py parity --games 300 --policy random
+#
+# Tracks come from the same ChunkGenerator as the game, one per seed, and
+# `parity` replays every batch game's jumps through Simulation to check
+# the results are identical. Needs numpy, which the game itself does not.
+
+# Tracks are generated (and finished games dropped) in epochs of this many
+# ticks, doubling up to EPOCH_MAX, so short-lived games never pay for a
+# long track.
+EPOCH_MIN = 120
+EPOCH_MAX = 1200
+# How far ahead of the player policies can see, in seconds of travel.
+SIGHT_SECONDS = 1.0
+
+# --- SPEED TABLE ---
+# Per-tick scroll distance and cumulative scroll, summed in the same order
+# as Simulation.step(), so the floats are identical.
+class SpeedTable(object):
+    def __init__(self, sim):
+        self.sim = sim
+        self.dx = [sim.scroll_speed * sim.speed_at(0)]
+        self.scroll = [0.0]
+    def extend(self, tick):
+        sim = self.sim
+        dx = self.dx
+        scroll = self.scroll
+        while len(dx) <= tick:
+            d = sim.scroll_speed * sim.speed_at(len(dx))
+            dx.append(d)
+            scroll.append(scroll[-1] + d)
+    def tick_at(self, distance):
+        # First tick whose scroll is at least `distance`.
+        while self.scroll[-1] < distance:
+            self.extend(2 * len(self.dx))
+        return bisect_left(self.scroll, distance)
+
+class TableChunkGenerator(ChunkGenerator):
+    # ChunkGenerator with speed_at() answered from a shared SpeedTable
+    # instead of stepping the speed curve per generator; same results.
+    def __init__(self, sim, seed, start, tick_rate, table):
+        super(TableChunkGenerator, self).__init__(sim, seed, start, tick_rate)
+        self.table = table
+    def speed_at(self, x):
+        scroll = x - self.player_x
+        if self.cursor_x < scroll:
+            tick = self.table.tick_at(scroll)
+            self.cursor_tick = tick
+            self.cursor_x = self.table.scroll[tick]
+            self.cursor_dx = self.table.dx[tick]
+        return self.cursor_dx
+
+# --- TRACK ---
+# One game's entities from the player onwards; generated on demand, passed
+# entities trimmed off.
+class Track(object):
+    __slots__ = ('generator', 'xs', 'ys', 'kinds', 'gone')
+    def __init__(self, generator):
+        self.generator = generator
+        self.xs = np.zeros(0)
+        self.ys = np.zeros(0)
+        self.kinds = np.zeros(0, dtype=np.uint8)
+        self.gone = np.zeros(0, dtype=bool)
+    def extend_to(self, x):
+        generator = self.generator
+        if generator.position >= x:
+            return
+        xs = [self.xs]
+        ys = [self.ys]
+        kinds = [self.kinds]
+        while generator.position < x:
+            chunk = generator.next_chunk()
+            xs.append(np.frombuffer(chunk.xs, dtype=np.float64))
+            ys.append(np.frombuffer(chunk.ys, dtype=np.float64))
+            kinds.append(np.frombuffer(chunk.kinds, dtype=np.uint8))
+        self.xs = np.concatenate(xs)
+        self.ys = np.concatenate(ys)
+        self.kinds = np.concatenate(kinds)
+        self.gone = np.concatenate([self.gone, np.zeros(len(self.xs) - len(self.gone), dtype=bool)])
+    def trim(self, x):
+        # Drops entities left of x.
+        k = np.searchsorted(self.xs, x)
+        if k:
+            self.xs = self.xs[k:]
+            self.ys = self.ys[k:]
+            self.kinds = self.kinds[k:]
+            self.gone = self.gone[k:]
+
+# --- POLICIES ---
+# A policy is called once per tick, before the step, with the BatchSimulator
+# and returns a bool array over its rows (batch.rows games; finished ones
+# are ignored): True presses jump, which as in the game only takes effect
+# on the ground.
+def never(batch):
+    return np.zeros(batch.rows, dtype=bool)
+
+class Periodic(object):
+    def __init__(self, period=45):
+        self.period = int(period)
+    def __call__(self, batch):
+        return np.full(batch.rows, batch.tick % self.period == 0)
+
+class RandomJump(object):
+    def __init__(self, probability=0.03):
+        self.probability = probability
+    def __call__(self, batch):
+        return batch.rng.random(batch.rows) < self.probability
+
+class Reactive(object):
+    # Jumps when the next obstacle is within `lead` ticks of travel.
+    def __init__(self, lead=6):
+        self.lead = lead
+    def __call__(self, batch):
+        return batch.obstacle_gap(self.lead * batch.dx_next) <= self.lead * batch.dx_next
+
+POLICIES = {
+    'never': lambda: never,
+    'periodic': Periodic,
+    'random': RandomJump,
+    'reactive': Reactive,
+}
+
+# --- BATCH SIMULATOR ---
+# All games start together and share the speed curve, so tick, scroll and
+# dx are scalars. The entities of every running game sit in one array
+# sorted by track x, so the only ones that can touch a player this tick are
+# one contiguous slice, found with two binary searches.
+class BatchSimulator(object):
+    def __init__(self, seeds, level=None, character=None, width=800, lives=None, rng_seed=0, record=False):
+        registry = load_registry()
+        self.level = level if level is not None else registry.level()
+        self.character = character if character is not None else registry.character(0)
+        self.width = width
+        # Rules come from a real Simulation so nothing is re-derived here.
+        self.rules = Simulation(width=width, seed=0, lives=lives, level=self.level, character=self.character)
+        self.table = SpeedTable(self.rules)
+        self.seeds = np.asarray(seeds, dtype=np.int64)
+        n = len(self.seeds)
+        player = self.rules.player
+        self.player_x = player.x
+        self.player_w = player.width
+        self.player_h = player.height
+        self.kind_w = np.zeros(2)
+        self.kind_w[OBSTACLE] = self.rules.obstacles.width
+        self.kind_w[COIN] = self.rules.coins.width
+        self.kind_h = np.zeros(2)
+        self.kind_h[OBSTACLE] = self.rules.obstacles.height
+        self.kind_h[COIN] = self.rules.coins.height
+        self.max_w = self.kind_w.max()
+        self.tracks = [Track(TableChunkGenerator(self.rules, int(seed), width, TICK_RATE, self.table))
+                       for seed in self.seeds]
+        self.rng = np.random.default_rng(rng_seed)
+        self.record = record
+        # Jump press ticks per game, for parity checks.
+        self.jumps = [[] for _ in range(n)] if record else None
+        self.tick = 0
+        self.scroll = 0.0
+        self.dx_next = self.table.dx[0]
+        # Per-row state of the games in the current epoch; `ids` maps rows
+        # to games. Games that finish mid-epoch only clear `alive`.
+        self.ids = np.arange(n)
+        self.alive = np.ones(n, dtype=bool)
+        self.y = np.zeros(n)
+        self.v = np.zeros(n)
+        # Simulation.jump_buffer and Simulation.coyote per row.
+        self.buffer = np.zeros(n, dtype=np.int64)
+        self.coyote = np.zeros(n, dtype=np.int64)
+        self.lives = np.full(n, player.lives, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.hits = np.zeros(n, dtype=np.int64)
+        # Results per game.
+        self.final_tick = np.zeros(n, dtype=np.int64)
+        self.final_score = np.zeros(n, dtype=np.int64)
+        self.final_hits = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.epoch = EPOCH_MIN
+        self.epoch_end = 0
+        self.ex = None
+    @property
+    def rows(self):
+        return len(self.ids)
+    @property
+    def running(self):
+        return int(self.alive.sum())
+    def _cutoff(self):
+        # Entities left of this can never be touched again.
+        return self.player_x + self.scroll - self.max_w
+    def _build_epoch(self, ticks):
+        keep = self.alive
+        if not keep.all():
+            self.ids = self.ids[keep]
+            self.y = self.y[keep]
+            self.v = self.v[keep]
+            self.buffer = self.buffer[keep]
+            self.coyote = self.coyote[keep]
+            self.lives = self.lives[keep]
+            self.score = self.score[keep]
+            self.hits = self.hits[keep]
+            self.alive = self.alive[keep]
+        end = self.tick + ticks
+        self.table.extend(end + 1)
+        dx = self.table.dx[end]
+        reach = self.table.scroll[end] + self.player_x + self.player_w + SIGHT_SECONDS * TICK_RATE * dx
+        cutoff = self._cutoff()
+        xs = []
+        ys = []
+        kinds = []
+        gone = []
+        rows = []
+        local = []
+        for row, game in enumerate(self.ids):
+            track = self.tracks[game]
+            track.trim(cutoff)
+            track.extend_to(reach)
+            n = len(track.xs)
+            xs.append(track.xs)
+            ys.append(track.ys)
+            kinds.append(track.kinds)
+            gone.append(track.gone)
+            rows.append(np.full(n, row, dtype=np.int64))
+            local.append(np.arange(n))
+        if not xs:
+            self.ex = None
+            return
+        order = np.argsort(np.concatenate(xs), kind='stable')
+        self.ex = np.concatenate(xs)[order]
+        self.ey = np.concatenate(ys)[order]
+        self.ekind = np.concatenate(kinds)[order]
+        self.egone = np.concatenate(gone)[order]
+        self.erow = np.concatenate(rows)[order]
+        self.elocal = np.concatenate(local)[order]
+        self.epoch_end = end
+    def _end_epoch(self):
+        # Copy collected/removed flags back for entities still ahead.
+        k = np.searchsorted(self.ex, self._cutoff())
+        for j in np.nonzero(self.egone[k:])[0]:
+            row = self.erow[k + j]
+            if self.alive[row]:
+                self.tracks[self.ids[row]].gone[self.elocal[k + j]] = True
+        self.ex = None
+    def _finish(self, row):
+        game = self.ids[row]
+        self.alive[row] = False
+        self.game_over[game] = True
+        self.final_tick[game] = self.tick
+        self.final_score[game] = self.score[row]
+        self.final_hits[game] = self.hits[row]
+    def obstacle_gap(self, horizon):
+        # Per row, distance from the player's right edge to the nearest
+        # obstacle ahead within `horizon` (at most SIGHT_SECONDS); inf when
+        # there is none.
+        gap = np.full(self.rows, np.inf)
+        right = self.player_x + self.scroll + self.player_w
+        lo = np.searchsorted(self.ex, right, 'left')
+        hi = np.searchsorted(self.ex, right + horizon, 'right')
+        if lo < hi:
+            sel = (self.ekind[lo:hi] == OBSTACLE) & ~self.egone[lo:hi]
+            np.minimum.at(gap, self.erow[lo:hi][sel], self.ex[lo:hi][sel] - right)
+        return gap
+    def run(self, ticks, policy=never):
+        stop = self.tick + ticks
+        while self.tick < stop and self.alive.any():
+            if self.ex is None or self.tick >= self.epoch_end:
+                if self.ex is not None:
+                    self._end_epoch()
+                    self.epoch = min(EPOCH_MAX, 2 * self.epoch)
+                self._build_epoch(min(self.epoch, stop - self.tick))
+            self.jump(policy(self))
+            self.step()
+        if self.ex is not None:
+            self._end_epoch()
+        alive = self.alive
+        if alive.any():
+            games = self.ids[alive]
+            self.final_tick[games] = self.tick
+            self.final_score[games] = self.score[alive]
+            self.final_hits[games] = self.hits[alive]
+        return self
+    def jump(self, pressed):
+        pressed = pressed & self.alive
+        if pressed.any():
+            self.buffer[pressed] = self.rules.buffer_ticks + 1
+            if self.record:
+                for game in self.ids[pressed]:
+                    self.jumps[game].append(self.tick)
+    def step(self):
+        self.tick += 1
+        tick = self.tick
+        table = self.table
+        prev_scroll = self.scroll
+        scroll = self.scroll = table.scroll[tick]
+        self.dx_next = table.dx[tick + 1] if tick + 1 < len(table.dx) else table.dx[tick]
+        rules = self.rules
+        v = self.v
+        y = self.y
+        buffer = self.buffer
+        coyote = self.coyote
+        pending = buffer > 0
+        if pending.any():
+            buffer[pending] -= 1
+            fire = pending & ((y == 0) | (coyote > 0))
+            v[fire] = rules.jump_velocity
+            buffer[fire] = 0
+            coyote[fire] = 0
+        v += rules.gravity
+        y += v
+        landed = y < 0
+        y[landed] = 0.0
+        v[landed] = 0.0
+        grounded = y == 0
+        coyote[grounded] = rules.coyote_ticks
+        np.subtract(coyote, 1, out=coyote, where=~grounded & (coyote > 0))
+        px = self.player_x + scroll
+        right = px + self.player_w
+        ex = self.ex
+        # Spawned by the end of the previous tick and inside the broadphase
+        # span (SortedAxis.span), as in the game; then aabb_hits.
+        lo = np.searchsorted(ex, px - self.max_w, 'left')
+        hi = np.searchsorted(ex, min(right, prev_scroll + self.width), 'right')
+        if lo >= hi:
+            return
+        wx = ex[lo:hi]
+        wk = self.ekind[lo:hi]
+        ww = self.kind_w[wk]
+        wy = self.ey[lo:hi]
+        rows = self.erow[lo:hi]
+        py = y[rows]
+        hit = (self.alive[rows] & ~self.egone[lo:hi]
+               & (wx >= px - ww) & (px <= wx + ww)
+               & (py + self.player_h >= wy) & (py <= wy + self.kind_h[wk]))
+        if not hit.any():
+            return
+        index = np.nonzero(hit)[0]
+        coins = index[wk[index] == COIN]
+        if len(coins):
+            np.add.at(self.score, rows[coins], 1)
+            self.egone[lo + coins] = True
+        # Obstacles in x order, so a game hitting several in one tick
+        # loses lives in the same order as Simulation.
+        finished = []
+        for k in index[wk[index] == OBSTACLE]:
+            row = rows[k]
+            self.hits[row] += 1
+            if self.lives[row] > 1:
+                self.lives[row] -= 1
+                self.egone[lo + k] = True
+            elif row not in finished:
+                finished.append(row)
+        for row in finished:
+            self._finish(row)
+
+# --- REPORTS ---
+def distribution(values):
+    values = np.asarray(values, dtype=np.float64)
+    q = np.percentile(values, [10, 25, 50, 75, 90, 99]) if len(values) else [0.0] * 6
+    return {
+        'mean': float(values.mean()) if len(values) else 0.0,
+        'p10': float(q[0]), 'p25': float(q[1]), 'p50': float(q[2]),
+        'p75': float(q[3]), 'p90': float(q[4]), 'p99': float(q[5]),
+        'max': float(values.max()) if len(values) else 0.0,
+    }
+
+def summarize(final_tick, final_score, game_over, ticks):
+    seconds = final_tick / float(TICK_RATE)
+    marks = [s for s in (10, 30, 60, 120, 300) if s * TICK_RATE <= ticks]
+    return {
+        'games': int(len(final_tick)),
+        'game_ticks': int(final_tick.sum()),
+        'survived': float(1.0 - game_over.mean()) if len(game_over) else 0.0,
+        'survival_seconds': distribution(seconds),
+        'score': distribution(final_score),
+        'alive_at': dict((f"{s}s", float((final_tick >= s * TICK_RATE).mean())) for s in marks),
+    }
+
+def apply_overrides(level, overrides):
+    # "name=value" pairs set on a copy of the level definition.
+    level = copy.copy(level)
+    for item in overrides or ():
+        name, _, value = item.partition('=')
+        if not hasattr(level, name):
+            raise SystemExit(f"unknown level attribute {name!r}")
+        setattr(level, name, float(value))
+    return level
+
+def run_shard(job):
+    seeds, ticks, policy_name, policy_arg, overrides, character_id, rng_seed = job
+    registry = load_registry()
+    level = apply_overrides(registry.level(), overrides)
+    factory = POLICIES[policy_name]
+    policy = factory(policy_arg) if policy_arg is not None else factory()
+    batch = BatchSimulator(seeds, level=level, character=registry.character(character_id), rng_seed=rng_seed)
+    batch.run(ticks, policy)
+    return batch.final_tick, batch.final_score, batch.final_hits, batch.game_over
+
+def run_batch(seeds, ticks, policy_name='reactive', policy_arg=None, overrides=None,
+              character_id=0, processes=1, rng_seed=0):
+    jobs = [(shard, ticks, policy_name, policy_arg, overrides, character_id, rng_seed + k)
+            for k, shard in enumerate(np.array_split(np.asarray(seeds), max(1, processes)))]
+    if processes > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(run_shard, jobs))
+    else:
+        results = [run_shard(job) for job in jobs]
+    return tuple(np.concatenate([r[k] for r in results]) for k in range(4))
+
+# --- PARITY ---
+def check_parity(seeds, ticks, policy, character_id=0, lives=None, verbose=False):
+    # Runs the batch with jump recording, then replays every game's jumps
+    # through the real Simulation and compares tick, score and hits.
+    registry = load_registry()
+    character = registry.character(character_id)
+    batch = BatchSimulator(seeds, character=character, lives=lives, record=True)
+    batch.run(ticks, policy)
+    sim = Simulation(seed=0, lives=lives, character=character)
+    mismatches = 0
+    for g, seed in enumerate(batch.seeds):
+        sim.reset(seed=int(seed), lives=lives, character=character)
+        jumps = batch.jumps[g]
+        k = 0
+        while not sim.game_over and sim.tick < ticks:
+            while k < len(jumps) and jumps[k] == sim.tick:
+                sim.jump()
+                k += 1
+            sim.step()
+        expected = (sim.tick, sim.score, sim.hits)
+        actual = (int(batch.final_tick[g]), int(batch.final_score[g]), int(batch.final_hits[g]))
+        if expected != actual:
+            mismatches += 1
+            if verbose:
+                print(f"seed {seed}: simulation {expected} batch {actual}")
+    return mismatches
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NumPy batch simulator for balancing")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run_parser = sub.add_parser('run', help="simulate many games and report distributions")
+    parity_parser = sub.add_parser('parity', help="compare the batch simulator with Simulation")
+    for p in (run_parser, parity_parser):
+        p.add_argument('--games', type=int, default=10000)
+        p.add_argument('--seconds', type=float, default=60)
+        p.add_argument('--seed', type=int, default=0, help="first track seed")
+        p.add_argument('--policy', choices=sorted(POLICIES), default='reactive')
+        p.add_argument('--policy-arg', type=float)
+        p.add_argument('--character', type=int, default=0)
+    run_parser.add_argument('--processes', type=int, default=1)
+    run_parser.add_argument('--set', action='append', metavar='NAME=VALUE',
+                            help="override a level value, e.g. gravity=-0.6")
+    run_parser.add_argument('--out')
+    args = parser.parse_args(argv)
+    ticks = int(args.seconds * TICK_RATE)
+    seeds = np.arange(args.seed, args.seed + args.games)
+    factory = POLICIES[args.policy]
+    if args.command == 'parity':
+        policy = factory(args.policy_arg) if args.policy_arg is not None else factory()
+        mismatches = check_parity(seeds, ticks, policy, args.character, verbose=True)
+        print(f"{args.games - mismatches}/{args.games} games match Simulation")
+        return 1 if mismatches else 0
+    t0 = time.perf_counter()
+    final_tick, final_score, final_hits, game_over = run_batch(
+        seeds, ticks, args.policy, args.policy_arg, args.set, args.character, args.processes)
+    elapsed = time.perf_counter() - t0
+    report = summarize(final_tick, final_score, game_over, ticks)
+    report['elapsed_s'] = elapsed
+    report['ticks_per_second'] = report['game_ticks'] / elapsed
+    report['policy'] = args.policy
+    report['overrides'] = args.set or []
+    print(f"{report['games']} games, {report['game_ticks']} ticks in {elapsed:.2f} s "
+          f"({report['ticks_per_second'] / 1e6:.2f}M ticks/s)")
+    survival = report['survival_seconds']
+    print(f"survival s: mean {survival['mean']:.1f}  p10 {survival['p10']:.1f}  p50 {survival['p50']:.1f}  "
+          f"p90 {survival['p90']:.1f}  (still alive at end: {report['survived']:.1%})")
+    score = report['score']
+    print(f"score:      mean {score['mean']:.1f}  p10 {score['p10']:.0f}  p50 {score['p50']:.0f}  "
+          f"p90 {score['p90']:.0f}  max {score['max']:.0f}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,436 @@
+import gc
+import os
+import sys
+import json
+import time
+import tempfile
+import logging
+import argparse
+import platform
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from simulation import Simulation
+from registry import load_registry
+from instrument import profiler, log
+from gcpolicy import gc_policy
+
+# Headless benchmark harness.
+#
+#   python benchmark.py run --out report.json
+#   python benchmark.py run --backend kivy --scenario ramp --scenario screens
+#   python benchmark.py run --scenario ramp --trace trace.json
+#   python benchmark.py compare baseline.json report.json --threshold 0.15
+#   python benchmark.py leaks --backend kivy --cycles 300
+#
+# The "sim" backend steps the bare Simulation; the "kivy" backend drives a
+# real RunnerApp/RunnerGame widget tree under a mock GL backend, so the
+# per-frame cost includes drawing-side work as well.
+
+FRAME = 1.0 / 60.0
+# Benchmarks measure fixed-length runs, so the player never dies.
+INVINCIBLE = 10 ** 9
+JUMP_PERIOD = 45
+REPORT_VERSION = 1
+# Leak check: games played before the baseline census, frames after which
+# a game that has not ended is abandoned, and types listed in the report.
+LEAK_WARMUP = 5
+MAX_GAME_FRAMES = 60 * 60
+LEAK_TOP = 15
+# Metrics checked by `compare`; lower is better for all of them.
+TRACKED_METRICS = ('frame_ms_mean', 'frame_ms_p95', 'frame_ms_p99', 'alloc_peak_kb', 'peak_rss_kb', 'gc_max_ms')
+# Cold start (kivy backend only), checked the same way.
+TRACKED_STARTUP = ('total_ms',)
+
+# --- SCENARIOS ---
+SCENARIOS = {
+    # name: (seconds, level, screen switches). The storm level's spawn table
+    # is dense and skips fair spacing, to load the broadphase.
+    'normal': (30, 'default', 0),
+    'ramp': (60, 'default', 0),
+    'storm': (20, 'storm', 0),
+    'screens': (0, 'default', 200),
+}
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+def current_rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+# --- BACKENDS ---
+class SimBackend(object):
+    name = 'sim'
+    startup = None
+    def __init__(self, seed):
+        self.seed = seed
+        self.sim = Simulation(seed=seed)
+    def start(self, level_id):
+        sim = self.sim
+        sim.configure(load_registry().level(level_id))
+        sim.reset(seed=self.seed, lives=INVINCIBLE)
+    def frame(self):
+        sim = self.sim
+        if sim.tick % JUMP_PERIOD == 0:
+            sim.jump()
+        sim.advance(FRAME)
+    def switch_screen(self, name):
+        raise RuntimeError("screen switching needs the kivy backend")
+    def play(self, seed, k):
+        # One game from reset to game over.
+        sim = self.sim
+        sim.reset(seed=seed)
+        for frame in range(MAX_GAME_FRAMES):
+            if sim.game_over:
+                break
+            if frame % JUMP_PERIOD == 0:
+                sim.jump()
+            sim.advance(FRAME)
+
+class KivyBackend(object):
+    name = 'kivy'
+    def __init__(self, seed, data_dir=None):
+        os.environ.setdefault('KIVY_NO_ARGS', '1')
+        os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+        os.environ.setdefault('KIVY_NO_FILELOG', '1')
+        import main
+        from kivy.uix.screenmanager import NoTransition
+        if main.Window is None:
+            raise RuntimeError("no Kivy window provider available; use --backend sim")
+        self.seed = seed
+        app_class = main.RunnerApp
+        if data_dir is not None:
+            # Saves, replays and caches go to data_dir, not the player's.
+            app_class = type('IsolatedRunnerApp', (main.RunnerApp,), {'user_data_dir': data_dir})
+        self.app = app_class()
+        self.root = self.app.build()
+        self.root.transition = NoTransition()
+        self.root.current = 'game'
+        # Import of main through build() and the game screen; the app's
+        # event loop never runs here, so there is no first frame.
+        self.startup = main.startup.report()
+        self.game = self.root.get_screen('game').game_widget
+        self.sim = self.game.sim
+    def start(self, level_id):
+        self.root.current = 'game'
+        game = self.game
+        game.reset_game()
+        game.sim.configure(self.app.registry.level(level_id))
+        game.sim.reset(seed=self.seed, lives=INVINCIBLE)
+    def frame(self):
+        sim = self.sim
+        if sim.tick % JUMP_PERIOD == 0:
+            sim.jump()
+        self.game.update(FRAME)
+    def switch_screen(self, name):
+        self.root.current = name
+    def play(self, seed, k):
+        # Play Again after the previous game; every tenth game goes through
+        # the main menu instead. A game still running at MAX_GAME_FRAMES is
+        # left through the menu button.
+        from kivy.clock import Clock
+        game = self.game
+        if k % 10 == 0:
+            self.root.current = 'menu'
+            Clock.tick()
+            self.root.current = 'game'
+        game.reset_game()
+        for frame in range(MAX_GAME_FRAMES):
+            if game.game_over:
+                break
+            if frame % JUMP_PERIOD == 0:
+                game.press_jump()
+            game.update(FRAME)
+        else:
+            game.go_to_menu(None)
+        # Run what the game scheduled on the Clock, as the event loop would.
+        Clock.tick()
+    def close(self):
+        # Stops the app's worker threads and closes saves.db, as on exit.
+        self.app.on_stop()
+
+BACKENDS = {'sim': SimBackend, 'kivy': KivyBackend}
+
+# --- RUNNER ---
+def run_frames(backend, seconds, level_id, switches, times=None):
+    backend.start(level_id)
+    clock = time.perf_counter
+    for _ in range(int(seconds / FRAME)):
+        t0 = clock()
+        backend.frame()
+        if times is not None:
+            times.append(clock() - t0)
+        profiler.end_frame(FRAME)
+    for k in range(switches):
+        t0 = clock()
+        backend.switch_screen('menu' if k % 2 == 0 else 'game')
+        if times is not None:
+            times.append(clock() - t0)
+    return times
+
+def run_scenario(backend, name):
+    seconds, level_id, switches = SCENARIOS[name]
+    sim = backend.sim
+    spawned = sim.obstacles.spawned + sim.coins.spawned
+    released = sim.obstacles.released + sim.coins.released
+    # Timing pass without tracemalloc, which would skew frame times, under
+    # the game's GC policy; automatic collections are counted.
+    gc_policy.install()
+    gc_policy.end_run()
+    gc_policy.begin_run()
+    times = run_frames(backend, seconds, level_id, switches, [])
+    gc_count, _, gc_max = gc_policy.run_summary()
+    # Per generation, before end_run() adds its own full collection.
+    gc_stats = gc_policy.report()
+    gc_policy.end_run()
+    spawned = sim.obstacles.spawned + sim.coins.spawned - spawned
+    released = sim.obstacles.released + sim.coins.released - released
+    # Identical seeded workload again, this time for allocations. Frame
+    # times are not kept so the harness's own list stays out of the numbers.
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    run_frames(backend, seconds, level_id, switches)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ms = sorted(t * 1000.0 for t in times)
+    return {
+        'frames': len(ms),
+        'ticks': sim.tick,
+        'frame_ms_mean': sum(ms) / len(ms) if ms else 0.0,
+        'frame_ms_p50': percentile(ms, 0.50),
+        'frame_ms_p95': percentile(ms, 0.95),
+        'frame_ms_p99': percentile(ms, 0.99),
+        'frame_ms_max': ms[-1] if ms else 0.0,
+        'spawned': spawned,
+        'removed': released,
+        'alloc_net_kb': (current - before) / 1024.0,
+        'alloc_peak_kb': (peak - before) / 1024.0,
+        'gc_collections': gc_count,
+        'gc_max_ms': gc_max * 1000.0,
+        'gc': gc_stats,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+@contextmanager
+def open_backend(args):
+    # The kivy backend runs a real app: its saves.db, replays and caches go
+    # to a throwaway directory, never the player's, removed afterwards.
+    if args.backend != 'kivy':
+        yield BACKENDS[args.backend](args.seed)
+        return
+    with tempfile.TemporaryDirectory(prefix='runner-bench-', ignore_cleanup_errors=True) as data_dir:
+        backend = KivyBackend(args.seed, data_dir)
+        try:
+            yield backend
+        finally:
+            backend.close()
+
+def run(args):
+    with open_backend(args) as backend:
+        names = args.scenario or list(SCENARIOS)
+        report = {
+            'version': REPORT_VERSION,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'backend': backend.name,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scenarios': {},
+        }
+        if backend.startup is not None:
+            report['startup'] = backend.startup
+            print(f"startup: {backend.startup['total_ms']:.1f} ms")
+        # The game logs every hit; keep that out of the timings.
+        level = log.level
+        log.setLevel(logging.WARNING)
+        try:
+            for name in names:
+                if SCENARIOS[name][2] and backend.name != 'kivy':
+                    print(f"{name}: skipped (needs --backend kivy)")
+                    continue
+                result = run_scenario(backend, name)
+                report['scenarios'][name] = result
+                print(f"{name}: {result['frames']} frames, mean {result['frame_ms_mean']:.3f} ms, "
+                      f"p99 {result['frame_ms_p99']:.3f} ms, peak alloc {result['alloc_peak_kb']:.1f} KB")
+                if args.trace:
+                    # One more pass with the profiler's scopes recording.
+                    profiler.enable()
+                    try:
+                        run_frames(backend, *SCENARIOS[name])
+                    finally:
+                        profiler.disable()
+        finally:
+            log.setLevel(level)
+    if args.trace:
+        count = profiler.export_chrome_trace(args.trace)
+        print(f"{count} trace events written to {args.trace}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"report written to {args.out}")
+    return 0
+
+# --- LEAK CHECK ---
+# Plays `cycles` games and compares live objects per type (count and
+# shallow size, over everything the cyclic GC tracks), traced allocations
+# per source line and RSS before and after. A type that gains at least one
+# object per game is reported as a leak.
+def type_census():
+    gc.collect()
+    counts = {}
+    sizes = {}
+    for obj in gc.get_objects():
+        t = type(obj)
+        name = f"{t.__module__}.{t.__qualname__}"
+        counts[name] = counts.get(name, 0) + 1
+        sizes[name] = sizes.get(name, 0) + sys.getsizeof(obj)
+    return counts, sizes
+
+def leaks(args):
+    with open_backend(args) as backend:
+        level = log.level
+        log.setLevel(logging.WARNING)
+        try:
+            for k in range(LEAK_WARMUP):
+                backend.play(args.seed + k, k)
+            tracemalloc.start()
+            # Snapshot first, so its own traces are in both censuses.
+            snapshot0 = tracemalloc.take_snapshot()
+            counts0, sizes0 = type_census()
+            rss0 = current_rss_kb()
+            for k in range(LEAK_WARMUP, LEAK_WARMUP + args.cycles):
+                backend.play(args.seed + k, k)
+            counts1, sizes1 = type_census()
+            snapshot1 = tracemalloc.take_snapshot()
+            rss1 = current_rss_kb()
+            tracemalloc.stop()
+        finally:
+            log.setLevel(level)
+    growth = []
+    for name in set(counts0) | set(counts1):
+        delta = counts1.get(name, 0) - counts0.get(name, 0)
+        if delta > 0:
+            growth.append((delta, sizes1.get(name, 0) - sizes0.get(name, 0), name))
+    growth.sort(reverse=True)
+    sites = [stat for stat in snapshot1.compare_to(snapshot0, 'lineno') if stat.size_diff > 0][:LEAK_TOP]
+    leaking = [name for delta, size, name in growth if delta >= args.cycles]
+    print(f"{args.cycles} games on the {backend.name} backend")
+    if rss0 is not None:
+        print(f"RSS {rss0} KB -> {rss1} KB ({(rss1 - rss0) / float(args.cycles):+.1f} KB per game)")
+    print("object growth by type:")
+    for delta, size, name in growth[:LEAK_TOP]:
+        print(f"  {name:50} {delta:+8d} objects {size / 1024.0:+10.1f} KB  {delta / float(args.cycles):6.2f}/game")
+    print("allocation growth by line:")
+    for stat in sites:
+        frame = stat.traceback[0]
+        print(f"  {frame.filename}:{frame.lineno:<6} {stat.size_diff / 1024.0:+10.1f} KB {stat.count_diff:+8d} blocks")
+    if args.out:
+        report = {
+            'backend': backend.name,
+            'cycles': args.cycles,
+            'rss_kb': [rss0, rss1],
+            'types': dict((name, {'objects': delta, 'bytes': size}) for delta, size, name in growth),
+            'lines': [{'site': f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                       'bytes': s.size_diff, 'blocks': s.count_diff} for s in sites],
+            'leaking': leaking,
+        }
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if leaking:
+        print(f"leaking (one or more objects per game): {', '.join(leaking)}")
+        return 1
+    return 0
+
+# --- COMPARE ---
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = 0
+    missing = 0
+    def check(name, metric, old, new):
+        limit = old * (1.0 + args.threshold)
+        status = 'ok'
+        # Ignore noise on metrics that are tiny to begin with.
+        regressed = new > limit and new - old > args.min_delta
+        if regressed:
+            status = 'REGRESSION'
+        change = (new - old) / old * 100.0 if old else 0.0
+        print(f"{name:10} {metric:15} {old:12.3f} -> {new:12.3f} ({change:+6.1f}%) {status}")
+        return regressed
+    for name, base in sorted(baseline.get('scenarios', {}).items()):
+        cur = current.get('scenarios', {}).get(name)
+        if cur is None:
+            # A scenario that stopped running must not pass as "no regression".
+            print(f"{name}: MISSING from current report")
+            missing += 1
+            continue
+        for metric in TRACKED_METRICS:
+            old = base.get(metric)
+            new = cur.get(metric)
+            if old is None or new is None:
+                continue
+            if check(name, metric, old, new):
+                regressions += 1
+    base = baseline.get('startup')
+    cur = current.get('startup')
+    if base is not None and cur is not None:
+        for metric in TRACKED_STARTUP:
+            if check('startup', metric, base[metric], cur[metric]):
+                regressions += 1
+    if regressions:
+        print(f"{regressions} metric(s) regressed by more than {args.threshold:.0%}")
+    if missing:
+        print(f"{missing} baseline scenario(s) missing from {args.current}")
+    return 1 if regressions or missing else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RunnerGame benchmark harness")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run_parser = sub.add_parser('run', help="run scenarios and write a JSON report")
+    run_parser.add_argument('--backend', choices=sorted(BACKENDS), default='sim')
+    run_parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS))
+    run_parser.add_argument('--seed', type=int, default=1234)
+    run_parser.add_argument('--out')
+    run_parser.add_argument('--trace', help="also write a Chrome trace of the profiled scopes")
+    run_parser.set_defaults(func=run)
+    compare_parser = sub.add_parser('compare', help="fail if a report regressed against a baseline")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.15)
+    compare_parser.add_argument('--min-delta', type=float, default=0.05)
+    compare_parser.set_defaults(func=compare)
+    leaks_parser = sub.add_parser('leaks', help="play many games and report object and memory growth")
+    leaks_parser.add_argument('--backend', choices=sorted(BACKENDS), default='kivy')
+    leaks_parser.add_argument('--cycles', type=int, default=100)
+    leaks_parser.add_argument('--seed', type=int, default=1234)
+    leaks_parser.add_argument('--out')
+    leaks_parser.set_defaults(func=leaks)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
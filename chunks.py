@@ -0,0 +1,207 @@
+import random
+from bisect import bisect_right
+import threading
+from array import array
+from collections import deque
+from instrument import profiler
+
+OBSTACLE = 0
+COIN = 1
+# Each chunk covers about this much travel time.
+CHUNK_SECONDS = 1.0
+# Time the player gets between landing and the next obstacle group.
+REACTION_SECONDS = 0.25
+COIN_SPACING = 10
+CHUNK_SCOPE = profiler.scope('chunk')
+
+# --- CHUNK ---
+# One precomputed track segment: entity positions in track space, sorted by
+# x, and the kind of each (OBSTACLE or COIN). Activating an entity is a
+# read from these arrays and a pool spawn.
+class Chunk(object):
+    __slots__ = ('xs', 'ys', 'kinds', 'count')
+    def __init__(self, xs, ys, kinds):
+        self.xs = xs
+        self.ys = ys
+        self.kinds = kinds
+        self.count = len(xs)
+
+# --- GENERATOR ---
+# Builds chunks ahead of the player from the level's spawn table, using its
+# own RNG so the track depends only on the seed, never on which thread
+# generated it or when. Groups are spaced in distance: the level's spawn
+# interval at base speed, but never closer than the player needs to land
+# and jump again at the speed they will be travelling there. Obstacle
+# groups are capped at what one jump clears.
+#
+# Levels with fair spacing turned off (stress levels) skip both rules:
+# groups come every spawn gap whatever their size and may overlap.
+class ChunkGenerator(object):
+    def __init__(self, sim, seed, start, tick_rate):
+        # Only reads level rules, which do not change during a run.
+        self.sim = sim
+        self.tick_rate = tick_rate
+        self.rng = random.Random(seed)
+        self.player_x = sim.player.x
+        self.player_width = sim.player.width
+        self.base_gap = sim.spawn_interval * tick_rate * sim.scroll_speed * sim.speed_base
+        self.airtime, self.clear_ticks = self.jump_arc(sim.gravity, sim.jump_velocity, sim.obstacles.height)
+        self.reaction_ticks = REACTION_SECONDS * tick_rate
+        self.fair = sim.fair_spacing
+        # Unfair levels: entries generated past the last group's start, held
+        # for the next chunk so chunks stay sorted end to end.
+        self.carry = []
+        # The first group comes about one spawn gap after `start`.
+        self.prev_start = start
+        self.position = start
+        # Distance scrolled by the end of tick cursor_tick, for speed_at().
+        self.cursor_tick = 0
+        self.cursor_x = 0.0
+        self.cursor_dx = sim.scroll_speed * sim.speed_at(0)
+    @staticmethod
+    def jump_arc(gravity, jump_velocity, height):
+        # Steps the same per-tick physics as Simulation.step(): ticks in the
+        # air, and ticks spent strictly above an obstacle of this height.
+        y = 0.0
+        velocity = jump_velocity
+        airtime = 0
+        above = 0
+        while True:
+            velocity += gravity
+            y += velocity
+            airtime += 1
+            if y <= 0:
+                return airtime, above
+            if y > height:
+                above += 1
+    def speed_at(self, x):
+        # Per-tick scroll distance when the player reaches track x.
+        sim = self.sim
+        scroll = x - self.player_x
+        while self.cursor_x < scroll:
+            self.cursor_tick += 1
+            self.cursor_dx = sim.scroll_speed * sim.speed_at(self.cursor_tick)
+            self.cursor_x += self.cursor_dx
+        return self.cursor_dx
+    def next_chunk(self):
+        with CHUNK_SCOPE:
+            return self._build()
+    def _build(self):
+        sim = self.sim
+        rng = self.rng
+        xs = array('d')
+        ys = array('d')
+        kinds = array('B')
+        limit = self.position + CHUNK_SECONDS * self.tick_rate * self.speed_at(self.position)
+        while True:
+            r = rng.random() * sim.spawn_weight
+            for rule in sim.spawn_rules:
+                if r < rule[0]:
+                    break
+            _, kind, y_min, y_max, count_min, count_max = rule
+            y = y_min if y_min == y_max else rng.randint(y_min, y_max)
+            count = count_min if count_min == count_max else rng.randint(count_min, count_max)
+            x = self.prev_start + self.base_gap * rng.uniform(0.75, 1.25)
+            dx = self.speed_at(x)
+            if kind == OBSTACLE:
+                width = sim.obstacles.width
+                pitch = width
+                if self.fair:
+                    # Land, react, and the next group must still be ahead.
+                    x = max(x, self.position + (self.airtime + self.reaction_ticks) * dx + self.player_width)
+                    dx = self.speed_at(x)
+                    clear = self.clear_ticks * dx - self.player_width - dx
+                    count = max(1, min(count, int(clear // pitch)))
+            else:
+                width = sim.coins.width
+                pitch = width + COIN_SPACING
+                if self.fair:
+                    x = max(x, self.position + COIN_SPACING)
+            for k in range(count):
+                xs.append(x + k * pitch)
+                ys.append(y)
+                kinds.append(kind)
+            self.prev_start = x
+            self.position = max(self.position, x + (count - 1) * pitch + width)
+            if x >= limit:
+                break
+        if not self.fair:
+            return self._sorted_chunk(xs, ys, kinds)
+        return Chunk(xs, ys, kinds)
+    def _sorted_chunk(self, xs, ys, kinds):
+        # Later groups start after the last one did, so everything up to its
+        # start is final; the rest waits for the next chunk.
+        entries = sorted(self.carry + list(zip(xs, ys, kinds)))
+        k = bisect_right(entries, (self.prev_start, float('inf')))
+        self.carry = entries[k:]
+        xs = array('d', [e[0] for e in entries[:k]])
+        ys = array('d', [e[1] for e in entries[:k]])
+        kinds = array('B', [e[2] for e in entries[:k]])
+        return Chunk(xs, ys, kinds)
+
+# --- SCHEDULER ---
+# Hands finished chunks to the simulation. A worker thread keeps the ready
+# queue filled up to the requested horizon; the simulation pops from the
+# deque without locking. Only if the queue has run dry does the simulation
+# take the generator lock and build the next chunk itself.
+class ChunkScheduler(object):
+    def __init__(self):
+        self.generator = None
+        self.ready = deque()
+        self.horizon = 0.0
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.closed = False
+        # Chunks the simulation had to build itself.
+        self.misses = 0
+    def reset(self, generator):
+        with self.lock:
+            self.generator = generator
+            self.ready.clear()
+            self.horizon = 0.0
+            self.misses = 0
+    def request(self, horizon):
+        # Ask for chunks to be ready up to track x `horizon`.
+        self.horizon = horizon
+        if self.thread is not None:
+            self.wake.set()
+    def next_chunk(self):
+        try:
+            return self.ready.popleft()
+        except IndexError:
+            pass
+        with self.lock:
+            if self.ready:
+                return self.ready.popleft()
+            self.misses += 1
+            return self.generator.next_chunk()
+    def fill(self):
+        # Generates up to the horizon, one chunk per lock hold so the
+        # simulation is never kept waiting for more than one chunk.
+        while not self.closed:
+            with self.lock:
+                generator = self.generator
+                if generator is None or generator.position >= self.horizon:
+                    return
+                self.ready.append(generator.next_chunk())
+    def start(self):
+        if self.thread is None:
+            self.closed = False
+            self.thread = threading.Thread(target=self._run, name='chunk-generator', daemon=True)
+            self.thread.start()
+        self.wake.set()
+    def stop(self):
+        thread = self.thread
+        if thread is not None:
+            self.closed = True
+            self.wake.set()
+            thread.join()
+            self.thread = None
+    def _run(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            if self.closed:
+                return
+            self.fill()
@@ -0,0 +1,80 @@
+from bisect import bisect_left, bisect_right
+
+# --- AABB BATCH TEST ---
+# Tests one box against the entities ids[lo:hi] of a pool and appends the
+# slot ids that overlap it to out. Same rule as Widget.collide_widget:
+# touching edges count as a hit.
+def aabb_hits(pool, ids, lo, hi, x, y, width, height, out):
+    xs = pool.x
+    ys = pool.y
+    ew = pool.width
+    eh = pool.height
+    right = x + width
+    top = y + height
+    for k in range(lo, hi):
+        i = ids[k]
+        ex = xs[i]
+        if right < ex or x > ex + ew:
+            continue
+        ey = ys[i]
+        if top < ey or y > ey + eh:
+            continue
+        out.append(i)
+    return out
+
+# --- SORTED AXIS ---
+# Broadphase for one EntityPool. Everything scrolls left at the same speed,
+# so once the live slots are sorted by x they stay sorted: spawns are
+# inserted (almost always appended) by bisect, entities that scrolled off
+# leave from the front, and the player only needs testing against the slice
+# that overlaps its x-window.
+class SortedAxis(object):
+    __slots__ = ('pool', 'keys', 'ids', 'hits')
+    def __init__(self, pool):
+        self.pool = pool
+        self.keys = []
+        self.ids = []
+        self.hits = []
+    def add(self, i):
+        x = self.pool.x[i]
+        k = bisect_right(self.keys, x)
+        self.keys.insert(k, x)
+        self.ids.insert(k, i)
+    def spawn(self, x, y):
+        i = self.pool.spawn(x, y)
+        self.add(i)
+        return i
+    def release(self, i):
+        keys = self.keys
+        ids = self.ids
+        k = bisect_left(keys, self.pool.x[i])
+        while ids[k] != i:
+            k += 1
+        del keys[k]
+        del ids[k]
+        self.pool.release(i)
+    def clear(self):
+        del self.keys[:]
+        del self.ids[:]
+        self.pool.clear()
+    def expire(self, left):
+        # Releases every entity whose right edge is left of `left`.
+        n = bisect_left(self.keys, left - self.pool.width)
+        if n:
+            pool = self.pool
+            ids = self.ids
+            for k in range(n):
+                pool.release(ids[k])
+            del self.keys[:n]
+            del ids[:n]
+        return n
+    def span(self, x0, x1):
+        keys = self.keys
+        return bisect_left(keys, x0 - self.pool.width), bisect_right(keys, x1)
+    def collide(self, x, y, width, height):
+        hits = self.hits
+        del hits[:]
+        lo, hi = self.span(x, x + width)
+        if lo < hi:
+            aabb_hits(self.pool, self.ids, lo, hi, x, y, width, height, hits)
+        return hits
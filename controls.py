@@ -0,0 +1,64 @@
+import time
+from collections import deque
+from instrument import profiler
+
+JUMP = 'jump'
+# Keycodes that jump: space and the up arrow.
+JUMP_KEYS = (32, 273)
+# Latency samples kept for the stats.
+LATENCY_SAMPLES = 240
+
+# --- INPUT QUEUE ---
+# Touches and keys are timestamped when Kivy delivers them and queued; the
+# simulation takes them in Simulation.advance(), each before the first tick
+# at or after its timestamp, instead of whenever the event loop happened
+# to run. Several presses due at the same tick are one jump.
+#
+# Latency is measured per applied press: event to the tick that took it,
+# and event to the next buffer flip (input-to-photon, as far as the app
+# can see it).
+class InputQueue(object):
+    def __init__(self):
+        self.events = deque()
+        # Event timestamps applied since the last flip.
+        self.shown = []
+        self.tick_ms = deque(maxlen=LATENCY_SAMPLES)
+        self.flip_ms = deque(maxlen=LATENCY_SAMPLES)
+        self.coalesced = 0
+    def push(self, action=JUMP, timestamp=None):
+        self.events.append((timestamp if timestamp is not None else time.perf_counter(), action))
+    def clear(self):
+        self.events.clear()
+        del self.shown[:]
+    def apply(self, sim, tick_time):
+        events = self.events
+        if not events or events[0][0] > tick_time:
+            return
+        jumped = False
+        while events and events[0][0] <= tick_time:
+            timestamp, action = events.popleft()
+            if action == JUMP:
+                if jumped:
+                    self.coalesced += 1
+                else:
+                    jumped = True
+                    sim.jump()
+                # An event older than the tick it lands in waited for it.
+                self.tick_ms.append(max(0.0, tick_time - timestamp) * 1000.0)
+                self.shown.append(timestamp)
+    def on_flip(self, *args):
+        if self.shown:
+            now = time.perf_counter()
+            for timestamp in self.shown:
+                self.flip_ms.append((now - timestamp) * 1000.0)
+            del self.shown[:]
+            if profiler.enabled:
+                profiler.count('input_ms', self.flip_ms[-1])
+    def latency(self):
+        # {'tick_ms': (mean, p95, max), 'flip_ms': ...}, None when empty.
+        stats = {}
+        for name, samples in (('tick_ms', self.tick_ms), ('flip_ms', self.flip_ms)):
+            values = sorted(samples)
+            n = len(values)
+            stats[name] = (sum(values) / n, values[min(n - 1, int(0.95 * (n - 1) + 0.5))], values[-1]) if n else None
+        return stats
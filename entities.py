@@ -0,0 +1,52 @@
+from array import array
+from itertools import repeat
+
+# --- ENTITY POOL ---
+# Obstacles and coins live in preallocated slots instead of one Widget each.
+# Positions are kept in flat arrays; a released slot goes back on the free
+# list and is reused by the next spawn, so a running game allocates nothing
+# once the pool has grown to its working size.
+class EntityPool(object):
+    __slots__ = ('width', 'height', 'x', 'y', 'alive', 'capacity', 'count', 'spawned', 'released', '_free')
+    def __init__(self, width, height, capacity=16):
+        self.width = width
+        self.height = height
+        self.x = array('d')
+        self.y = array('d')
+        self.alive = array('B')
+        self.capacity = 0
+        self.count = 0
+        # Lifetime counters, read by the benchmark harness.
+        self.spawned = 0
+        self.released = 0
+        self._free = []
+        self.grow(capacity)
+    def grow(self, n):
+        start = self.capacity
+        self.x.extend(repeat(0.0, n))
+        self.y.extend(repeat(0.0, n))
+        self.alive.extend(repeat(0, n))
+        # Lowest slot ids are handed out first.
+        self._free.extend(range(start + n - 1, start - 1, -1))
+        self.capacity = start + n
+    def spawn(self, x, y):
+        if not self._free:
+            self.grow(self.capacity or 16)
+        i = self._free.pop()
+        self.x[i] = x
+        self.y[i] = y
+        self.alive[i] = 1
+        self.count += 1
+        self.spawned += 1
+        return i
+    def release(self, i):
+        if self.alive[i]:
+            self.alive[i] = 0
+            self._free.append(i)
+            self.count -= 1
+            self.released += 1
+    def clear(self):
+        alive = self.alive
+        for i in range(self.capacity):
+            if alive[i]:
+                self.release(i)
@@ -0,0 +1,115 @@
+import gc
+import time
+from instrument import log
+
+# Raised gen-1/gen-2 thresholds for a run: young collections stay automatic
+# (they are short), older generations wait for a scheduled collection.
+RUN_THRESHOLDS = (700, 1000, 1000000)
+# Idle frames collect a generation early once its count reaches this
+# fraction of the threshold, so the automatic trigger rarely fires.
+IDLE_FRACTION = 0.5
+# A frame whose own work took less than this has time to spare.
+IDLE_BUDGET = 0.004
+
+# --- GC POLICY ---
+# Decides when the cyclic garbage collector runs:
+#   - freeze() after startup moves everything alive (widgets, textures,
+#     registry, code) to the permanent generation, out of every later scan
+#   - begin_run() raises the thresholds for the duration of a run, or with
+#     mode='disable' turns automatic collection off entirely
+#   - idle() collects young generations in frames that have time to spare
+#   - end_run() and collect() run full collections at game over, screen
+#     transitions and pauses
+# Every pause is timed through gc.callbacks; automatic ones (not started by
+# the policy) are what shows up as frame jitter.
+class GcPolicy(object):
+    def __init__(self, mode='raise', run_thresholds=RUN_THRESHOLDS):
+        if mode not in ('raise', 'disable'):
+            raise ValueError(f"unknown GC mode {mode!r}")
+        self.mode = mode
+        self.run_thresholds = run_thresholds
+        self.saved_thresholds = None
+        self.running = False
+        self.installed = False
+        self.scheduled = False
+        self._start = 0.0
+        self.reset_stats()
+    def reset_stats(self):
+        # [collections, total seconds, max seconds] per generation.
+        self.automatic = [[0, 0.0, 0.0] for _ in range(3)]
+        self.manual = [[0, 0.0, 0.0] for _ in range(3)]
+    def install(self):
+        if not self.installed:
+            self.installed = True
+            gc.callbacks.append(self._on_gc)
+    def uninstall(self):
+        if self.installed:
+            self.installed = False
+            gc.callbacks.remove(self._on_gc)
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._start = time.perf_counter()
+        elif self._start:
+            dt = time.perf_counter() - self._start
+            self._start = 0.0
+            stats = (self.manual if self.scheduled else self.automatic)[info['generation']]
+            stats[0] += 1
+            stats[1] += dt
+            if dt > stats[2]:
+                stats[2] = dt
+    def collect(self, generation=2):
+        self.scheduled = True
+        try:
+            return gc.collect(generation)
+        finally:
+            self.scheduled = False
+    def freeze(self):
+        # Collect first so garbage is not frozen along with live objects.
+        self.collect()
+        if hasattr(gc, 'freeze'):
+            gc.freeze()
+    def begin_run(self):
+        if self.running:
+            return
+        self.running = True
+        self.reset_stats()
+        self.saved_thresholds = gc.get_threshold()
+        if self.mode == 'disable':
+            gc.disable()
+        else:
+            gc.set_threshold(*self.run_thresholds)
+    def end_run(self, collect=True):
+        if not self.running:
+            return
+        self.running = False
+        gc.set_threshold(*self.saved_thresholds)
+        if self.mode == 'disable':
+            gc.enable()
+        count, total, worst = self.run_summary()
+        log.info("GC: run had %d automatic collections, %.2f ms total, max %.2f ms",
+                 count, total * 1000.0, worst * 1000.0)
+        if collect:
+            self.collect()
+    def idle(self, work_time):
+        # Called once per frame with the time the frame's own work took.
+        if not self.running or work_time > IDLE_BUDGET:
+            return
+        counts = gc.get_count()
+        thresholds = self.run_thresholds
+        if counts[1] >= thresholds[1] * IDLE_FRACTION:
+            self.collect(1)
+        elif counts[0] >= thresholds[0] * IDLE_FRACTION:
+            self.collect(0)
+    def run_summary(self):
+        # (collections, total seconds, max seconds) of automatic pauses.
+        count = sum(s[0] for s in self.automatic)
+        total = sum(s[1] for s in self.automatic)
+        worst = max(s[2] for s in self.automatic)
+        return count, total, worst
+    def report(self):
+        def fmt(stats):
+            return [{'generation': g, 'collections': s[0], 'total_ms': s[1] * 1000.0, 'max_ms': s[2] * 1000.0}
+                    for g, s in enumerate(stats)]
+        return {'mode': self.mode, 'automatic': fmt(self.automatic), 'scheduled': fmt(self.manual)}
+
+gc_policy = GcPolicy()
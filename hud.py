@@ -0,0 +1,111 @@
+from kivy.uix.widget import Widget
+from kivy.core.text import Label as CoreLabel
+from kivy.graphics import Color, Rectangle
+from kivy.clock import Clock
+from kivy.metrics import sp
+from instrument import profiler
+
+DIGITS = '0123456789-'
+HUD_SCOPE = profiler.scope('hud')
+
+# --- GLYPH ATLAS ---
+# Digits are rasterised once into a single texture. A number is then drawn
+# as one Rectangle per digit pointing at that digit's texture coordinates,
+# so changing a value never goes through text layout or a texture upload.
+class GlyphAtlas(object):
+    _cache = {}
+    @classmethod
+    def get(cls, font_size, bold=False):
+        key = (font_size, bold)
+        atlas = cls._cache.get(key)
+        if atlas is None:
+            atlas = cls._cache[key] = cls(font_size, bold)
+        return atlas
+    def __init__(self, font_size, bold=False):
+        self.font_size = font_size
+        self.bold = bold
+        label = CoreLabel(text=DIGITS, font_size=font_size, bold=bold)
+        label.refresh()
+        self.texture = label.texture
+        self.height = self.texture.height
+        self.glyphs = {}
+        x = 0
+        for k, ch in enumerate(DIGITS):
+            right = label.get_extents(DIGITS[:k + 1])[0]
+            region = self.texture.get_region(x, 0, right - x, self.height)
+            self.glyphs[ch] = (right - x, region.tex_coords)
+            x = right
+    def render_text(self, text):
+        label = CoreLabel(text=text, font_size=self.font_size, bold=self.bold)
+        label.refresh()
+        return label.texture
+
+# --- HUD COUNTER ---
+# "Prefix: 123" with the prefix baked once and the digits from the atlas.
+class HudCounter(Widget):
+    def __init__(self, prefix, value=0, max_digits=10, font_size=None, color=(1, 1, 1, 1), **kwargs):
+        super(HudCounter, self).__init__(**kwargs)
+        self.atlas = GlyphAtlas.get(font_size or sp(15))
+        self.value = None
+        self.prefix_texture = self.atlas.render_text(prefix)
+        with self.canvas:
+            Color(*color)
+            self.prefix_rect = Rectangle(texture=self.prefix_texture, size=self.prefix_texture.size)
+            self.digit_rects = [Rectangle(texture=self.atlas.texture, size=(0, 0)) for _ in range(max_digits)]
+        self.text_width = 0
+        self.bind(pos=self.layout, size=self.layout)
+        self.set_value(value)
+    def set_value(self, value):
+        if value == self.value:
+            return False
+        self.value = value
+        text = str(value)
+        glyphs = self.atlas.glyphs
+        height = self.atlas.height
+        width = 0
+        for k, rect in enumerate(self.digit_rects):
+            if k < len(text):
+                w, tex_coords = glyphs[text[k]]
+                rect.tex_coords = tex_coords
+                rect.size = (w, height)
+                width += w
+            elif rect.size[0]:
+                rect.size = (0, 0)
+        self.text_width = self.prefix_texture.width + width
+        self.layout()
+        return True
+    def layout(self, *args):
+        # Centred in the widget box, like a Label's default halign/valign.
+        x = self.x + (self.width - self.text_width) / 2.0
+        y = self.center_y - self.atlas.height / 2.0
+        self.prefix_rect.pos = (x, y)
+        x += self.prefix_texture.width
+        for rect in self.digit_rects:
+            w = rect.size[0]
+            if not w:
+                break
+            rect.pos = (x, y)
+            x += w
+
+# --- HUD ---
+# Collects value changes and applies them at most once per frame; fields
+# whose value did not change are not touched.
+class Hud(object):
+    def __init__(self):
+        self.fields = {}
+        self.pending = {}
+        self._trigger = Clock.create_trigger(self.apply, -1)
+    def add(self, name, counter):
+        self.fields[name] = counter
+        return counter
+    def set(self, name, value):
+        if self.fields[name].value == value and name not in self.pending:
+            return
+        self.pending[name] = value
+        self._trigger()
+    def apply(self, *args):
+        with HUD_SCOPE:
+            pending = self.pending
+            for name, value in pending.items():
+                self.fields[name].set_value(value)
+            pending.clear()
@@ -0,0 +1,188 @@
+import os
+import gc
+import json
+import time
+import logging
+import threading
+from array import array
+from collections import deque
+
+# Frames kept in the ring buffer (4 s at 60 fps).
+RING_SIZE = 240
+# Trace events kept for Chrome trace export.
+TRACE_SIZE = 100000
+
+# --- SCOPES ---
+# A named timing scope, created once and reused:
+#
+#   UPDATE_SCOPE = profiler.scope('update')
+#   with UPDATE_SCOPE:
+#       ...
+#
+# While the profiler is disabled entering and leaving a scope is one
+# attribute check each, with no allocation.
+class Scope(object):
+    __slots__ = ('profiler', 'name', 't0', 'total', 'samples')
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.t0 = 0.0
+        # Seconds spent in the scope during the current frame.
+        self.total = 0.0
+        self.samples = array('d', bytes(8 * RING_SIZE))
+    def __enter__(self):
+        if self.profiler.enabled:
+            self.t0 = time.perf_counter()
+        return self
+    def __exit__(self, *exc):
+        profiler = self.profiler
+        if profiler.enabled and self.t0:
+            dt = time.perf_counter() - self.t0
+            self.total += dt
+            profiler.events.append((self.name, self.t0, dt, threading.get_ident()))
+            self.t0 = 0.0
+        return False
+
+# --- PROFILER ---
+# Per-frame samples (frame time, time per scope, GC pauses and counters such
+# as live entities) go into fixed-size ring buffers; end_frame() closes a
+# frame. Scope spans and GC pauses are also kept as trace events for
+# export_chrome_trace().
+class Profiler(object):
+    def __init__(self):
+        self.enabled = False
+        self.scopes = {}
+        self.counters = {}
+        self.events = deque(maxlen=TRACE_SIZE)
+        self.frame_ms = array('d', bytes(8 * RING_SIZE))
+        self.gc_ms = array('d', bytes(8 * RING_SIZE))
+        self.index = 0
+        self.frames = 0
+        self.gc_total = 0.0
+        self._gc_start = 0.0
+        self.t0 = time.perf_counter()
+    def scope(self, name):
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = Scope(self, name)
+        return scope
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            gc.callbacks.append(self._on_gc)
+    def disable(self):
+        if self.enabled:
+            self.enabled = False
+            gc.callbacks.remove(self._on_gc)
+            self._gc_start = 0.0
+            for scope in self.scopes.values():
+                scope.t0 = 0.0
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+        elif self._gc_start:
+            dt = time.perf_counter() - self._gc_start
+            self.gc_total += dt
+            self.events.append(('gc%d' % info['generation'], self._gc_start, dt, threading.get_ident()))
+            self._gc_start = 0.0
+    def count(self, name, value):
+        samples = self.counters.get(name)
+        if samples is None:
+            samples = self.counters[name] = array('d', bytes(8 * RING_SIZE))
+        samples[self.index] = value
+    def end_frame(self, dt):
+        if not self.enabled:
+            return
+        i = self.index
+        self.frame_ms[i] = dt * 1000.0
+        self.gc_ms[i] = self.gc_total * 1000.0
+        self.gc_total = 0.0
+        for scope in self.scopes.values():
+            scope.samples[i] = scope.total * 1000.0
+            scope.total = 0.0
+        self.index = (i + 1) % RING_SIZE
+        self.frames += 1
+    def reset(self):
+        self.events.clear()
+        self.index = 0
+        self.frames = 0
+    # --- READING ---
+    def window(self, samples):
+        # The filled part of a ring buffer, oldest first.
+        n = min(self.frames, RING_SIZE)
+        if n < RING_SIZE:
+            return samples[:n]
+        return samples[self.index:] + samples[:self.index]
+    def summary(self):
+        frames = sorted(self.window(self.frame_ms))
+        n = len(frames)
+        if not n:
+            return None
+        total = sum(frames)
+        latest = (self.index - 1) % RING_SIZE
+        gc_ms = self.window(self.gc_ms)
+        return {
+            'fps': n * 1000.0 / total if total else 0.0,
+            'frame_ms_mean': total / n,
+            'frame_ms_p95': frames[min(n - 1, int(0.95 * (n - 1) + 0.5))],
+            'frame_ms_max': frames[-1],
+            'scopes_ms': dict((name, sum(self.window(scope.samples)) / n)
+                              for name, scope in self.scopes.items()),
+            'counters': dict((name, samples[latest]) for name, samples in self.counters.items()),
+            'gc_ms_max': max(gc_ms),
+            'gc_ms_total': sum(gc_ms),
+        }
+    def histogram(self, bins=16, max_ms=50.0):
+        # Frame counts per frame-time bucket; the last bucket holds
+        # everything slower than max_ms.
+        counts = [0] * bins
+        width = max_ms / (bins - 1)
+        for ms in self.window(self.frame_ms):
+            counts[min(bins - 1, int(ms / width))] += 1
+        return counts
+    def export_chrome_trace(self, path):
+        # Trace Event Format, readable by chrome://tracing and Perfetto.
+        pid = os.getpid()
+        t0 = self.t0
+        events = [{'name': name, 'cat': 'gc' if name.startswith('gc') else 'scope', 'ph': 'X',
+                   'ts': (start - t0) * 1e6, 'dur': dt * 1e6, 'pid': pid, 'tid': tid}
+                  for name, start, dt, tid in list(self.events)]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
+
+profiler = Profiler()
+if os.environ.get('RUNNER_PROFILE'):
+    profiler.enable()
+
+# --- LOGGING ---
+# Lets each message template through at most `burst` times per `interval`
+# seconds; the first message after a quiet period reports how many were
+# dropped.
+class RateLimitFilter(logging.Filter):
+    def __init__(self, burst=5, interval=1.0):
+        super(RateLimitFilter, self).__init__()
+        self.burst = burst
+        self.interval = interval
+        self.windows = {}
+    def filter(self, record):
+        now = record.created
+        key = (record.levelno, record.msg)
+        window = self.windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window is not None else 0
+            self.windows[key] = [now, 1, 0]
+            if suppressed:
+                record.msg = record.getMessage() + f" ({suppressed} similar messages suppressed)"
+                record.args = None
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+# Child of Kivy's logger, so messages use its handlers and log level when
+# the app is running; headless tools get the logging defaults.
+log = logging.getLogger('kivy.runner')
+log.addFilter(RateLimitFilter())
@@ -1,191 +1,85 @@
 import os
-import json
-import random
+import time
+import weakref
+import sqlite3
+import shutil
+from startup import StartupTimer
+startup = StartupTimer()
+startup.begin('imports')
 from kivy.app import App
-from kivy.uix.widget import Widget
 from kivy.uix.floatlayout import FloatLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
-from kivy.properties import NumericProperty, ListProperty
+from kivy.properties import NumericProperty, StringProperty
 from kivy.clock import Clock
-from kivy.core.window import Window
-from kivy.graphics import Color, Rectangle, Triangle, Ellipse
-from kivy.animation import Animation
 from kivy.uix.screenmanager import ScreenManager, Screen
+from simulation import Simulation
+from renderer import EntityRenderer
+from persistence import ProgressStore
+from savestore import SaveStore, Run
+from hud import Hud, HudCounter
+from registry import load_registry
+from sprites import SpriteAtlas, SpriteWidget
+from replay import ReplayWriter
+from instrument import profiler, log
+from overlay import ProfilerOverlay
+from background import ParallaxBackground, GAME_LAYERS
+from gcpolicy import gc_policy
+from controls import InputQueue, JUMP_KEYS
+startup.end('imports')
+startup.begin('window')
+from kivy.core.window import Window
+# Importing TextInput creates the Window, so it belongs to this phase.
+from kivy.uix.textinput import TextInput
+startup.end('window')
 
-# --- BACKGROUND WIDGET ---
-class BackgroundWidget(Widget):
-    color = ListProperty([0.6, 1, 0.6, 1])
-    def __init__(self, duration=10, safe_colors=None, **kwargs):
-        super(BackgroundWidget, self).__init__(**kwargs)
-        if safe_colors is None:
-            safe_colors = [
-                [0.2, 0.2, 0.2, 1],
-                [0.3, 0.3, 0.3, 1],
-                [0.4, 0.4, 0.4, 1]
-            ]
-        self.safe_colors = safe_colors
-        with self.canvas:
-            self.bg_color = Color(*self.color)
-            self.bg_rect = Rectangle(pos=self.pos, size=self.size)
-        self.bind(pos=self._update_rect, size=self._update_rect, color=self._update_color)
-        self.current_index = 0
-        self.animate_to_next(duration)
-    def _update_rect(self, *args):
-        self.bg_rect.pos = self.pos
-        self.bg_rect.size = self.size
-    def _update_color(self, instance, value):
-        self.bg_color.rgba = value
-    def animate_to_next(self, duration):
-        next_index = (self.current_index + 1) % len(self.safe_colors)
-        next_color = self.safe_colors[next_index]
-        self.current_index = next_index
-        anim = Animation(color=next_color, duration=duration)
-        anim.bind(on_complete=lambda a, w: self.animate_to_next(duration))
-        anim.start(self)
+# Timing scopes shown in the profiler overlay.
+UPDATE_SCOPE = profiler.scope('update')
+SIM_SCOPE = profiler.scope('sim')
+RENDER_SCOPE = profiler.scope('render')
+# Keycodes for the profiler overlay and trace export.
+KEY_F3 = 284
+KEY_F4 = 285
+# Seconds between checks while prewarming waits for a run to end.
+PREWARM_RETRY = 0.5
 
 # --- CHARACTER PREVIEW ---
-class CharacterPreview(Widget):
-    def __init__(self, character_type, **kwargs):
-        super(CharacterPreview, self).__init__(**kwargs)
-        self.character_type = character_type
+class CharacterPreview(SpriteWidget):
+    def __init__(self, character, **kwargs):
+        super(CharacterPreview, self).__init__(sprite=App.get_running_app().sprites.sprite(character), **kwargs)
+        self.character = character
+        self.character_type = character.id
         self.size_hint = (None, None)
         self.size = (50, 50)
-        self.pos = (0, 0)
-        self.draw_preview()
-    def draw_preview(self):
-        self.canvas.clear()
-        if self.character_type == 0:
-            with self.canvas:
-                Color(1, 0, 0)
-                Rectangle(pos=self.pos, size=self.size)
-        elif self.character_type in [1,2]:
-            with self.canvas:
-                if self.character_type == 1:
-                    Color(1,1,1)
-                else:
-                    Color(1,0.75,0.8)
-                Triangle(points=[self.x, self.y,
-                                 self.x + self.width, self.y,
-                                 self.x + self.width/2, self.y + self.height])
-        elif self.character_type == 3:
-            with self.canvas:
-                Color(1,0,0)
-                Ellipse(pos=self.pos, size=self.size)
-                Color(1,1,0,0.5)
-                Ellipse(pos=(self.x-5, self.y-5), size=(self.width+10, self.height+10))
-    def on_pos(self, instance, value):
-        self.draw_preview()
-    def on_size(self, instance, value):
-        self.draw_preview()
 
 # --- PLAYER ---
-class Player(Widget):
-    velocity_y = NumericProperty(0)
-    gravity = -0.5
-    jump_velocity = 10
+class Player(SpriteWidget):
     def __init__(self, **kwargs):
         super(Player, self).__init__(**kwargs)
-        self.app = App.get_running_app()
+        # A proxy: widgets hold no strong reference back to the app.
+        self.app = weakref.proxy(App.get_running_app())
         # Seçili karakter App.selected_character_type'den alınır.
-        self.character_type = self.app.selected_character_type  # 0: free red square, 1: white triangle, 2: pink triangle, 3: red circle
-        if self.character_type == 3:
-            self.lives = 2
-        else:
-            self.lives = 1
+        self.character = self.app.registry.character(self.app.selected_character_type)
+        self.character_type = self.character.id
+        self.lives = self.character.lives
         self.size_hint = (None, None)
-        self.size = (50, 50)
+        self.size = self.character.hitbox
         self.pos = (100, 0)
-        print(f"[DEBUG] Player __init__: character_type = {self.character_type}")
+        log.debug("Runner: Player created with character_type %d", self.character_type)
         self.draw_character()
-        self.bind(pos=self.update_graphics, size=self.update_graphics)
-    def draw_character(self):
-        self.canvas.clear()
-        if self.character_type == 0:
-            print("[DEBUG] Drawing free red square")
-            with self.canvas:
-                Color(1, 0, 0)
-                self.shape = Rectangle(pos=self.pos, size=self.size)
-        elif self.character_type in [1, 2]:
-            with self.canvas:
-                if self.character_type == 1:
-                    Color(1, 1, 1)
-                else:
-                    Color(1, 0.75, 0.8)
-                self.shape = Triangle(points=[self.x, self.y,
-                                              self.x + self.width, self.y,
-                                              self.x + self.width/2, self.y + self.height])
-        elif self.character_type == 3:
-            with self.canvas:
-                Color(1, 0, 0)
-                self.shape = Ellipse(pos=self.pos, size=self.size)
-                Color(1, 1, 0, 0.5)
-                self.glow = Ellipse(pos=(self.x - 10, self.y - 10), size=(self.width + 20, self.height + 20))
-    def update_graphics(self, *args):
-        if self.character_type == 0:
-            self.shape.pos = self.pos
-            self.shape.size = self.size
-        elif self.character_type in [1, 2]:
-            self.shape.points = [self.x, self.y,
-                                 self.x + self.width, self.y,
-                                 self.x + self.width/2, self.y + self.height]
-        elif self.character_type == 3:
-            self.shape.pos = self.pos
-            self.shape.size = self.size
-            self.glow.pos = (self.x - 10, self.y - 10)
-            self.glow.size = (self.width + 20, self.height + 20)
-    def update(self):
-        self.velocity_y += self.gravity
-        new_y = self.y + self.velocity_y
-        if new_y < 0:
-            new_y = 0
-            self.velocity_y = 0
-        self.y = new_y
-    def jump(self):
-        if self.y == 0:
-            self.velocity_y = self.jump_velocity
-
-# --- OBSTACLE ---
-class Obstacle(Widget):
-    def __init__(self, **kwargs):
-        super(Obstacle, self).__init__(**kwargs)
-        self.size_hint = (None, None)
-        self.size = (40, 40)
-        with self.canvas:
-            Color(0, 0, 1)
-            self.rect = Rectangle(pos=self.pos, size=self.size)
-        self.bind(pos=self.update_graphics, size=self.update_graphics)
-    def update_graphics(self, *args):
-        self.rect.pos = self.pos
-        self.rect.size = self.size
-    def update(self):
-        multiplier = self.parent.speed_multiplier if self.parent and hasattr(self.parent, 'speed_multiplier') else 1
-        self.x -= 5 * multiplier
-        if self.x < -self.width:
-            if self.parent:
-                self.parent.remove_widget(self)
-
-# --- COIN ---
-class Coin(Widget):
-    def __init__(self, **kwargs):
-        super(Coin, self).__init__(**kwargs)
-        self.size_hint = (None, None)
-        self.size = (30, 30)
-        with self.canvas:
-            Color(1, 1, 0)
-            self.rect = Rectangle(pos=self.pos, size=self.size)
-        self.bind(pos=self.update_graphics, size=self.update_graphics)
-    def update_graphics(self, *args):
-        self.rect.pos = self.pos
-        self.rect.size = self.size
-    def update(self):
-        multiplier = self.parent.speed_multiplier if self.parent and hasattr(self.parent, 'speed_multiplier') else 1
-        self.x -= 5 * multiplier
-        if self.x < -self.width:
-            if self.parent:
-                self.parent.remove_widget(self)
+    def set_character(self, character_type):
+        self.character = self.app.registry.character(character_type)
+        self.character_type = self.character.id
+        self.lives = self.character.lives
+        self.size = self.character.hitbox
+        self.draw_character()
+    def draw_character(self, *args):
+        # Only the sprite's texture region changes.
+        self.set_sprite(self.app.sprites.sprite(self.character))
 
 # --- RUNNER GAME (oyun ekranı) ---
+HUD_COLOR = (1, 1, 1, 0.3)
+PROFILER_CORNER = 60
 class RunnerGame(FloatLayout):
     score = NumericProperty(0)
     speed_multiplier = NumericProperty(1)
@@ -205,92 +99,120 @@ class RunnerGame(FloatLayout):
             [0.0, 0.0, 0.0, 1],    # siyah
             [0.0, 0.8, 0.8, 1]     # turkuaz
         ]
-        self.bg = BackgroundWidget(duration=3, safe_colors=in_game_colors, size=self.size, pos=self.pos)
+        self.bg = ParallaxBackground(palette=in_game_colors, duration=3, layers=GAME_LAYERS,
+                                     size=self.size, pos=self.pos)
         self.add_widget(self.bg, index=0)
+        self.sim = Simulation(width=Window.width, level=App.get_running_app().registry.level())
+        self.sim.on_coin = self.on_coin_collected
+        self.sim.on_hit = self.on_player_hit
+        self.sim.on_game_over = self.on_game_over
+        # Upcoming track chunks are generated on a worker thread.
+        self.sim.scheduler.start()
+        self.obstacles = self.sim.obstacles
+        self.coins = self.sim.coins
+        self.entity_layer = EntityRenderer([(self.obstacles, (0, 0, 1)), (self.coins, (1, 1, 0))])
+        self.add_widget(self.entity_layer)
         self.player = Player()
         self.add_widget(self.player)
-        self.total_coins_label = Label(text=f"Total Coins: {App.get_running_app().total_coins}",
-                                       size_hint=(None, None), size=(200, 50),
-                                       pos_hint={'x': 0, 'top': 1},
-                                       disabled=True)
+        app = App.get_running_app()
+        # Counters redraw only digits that changed, at most once per frame.
+        # HUD_COLOR matches the disabled Labels used here before.
+        self.hud = Hud()
+        self.total_coins_label = self.hud.add('total_coins', HudCounter("Total Coins: ", app.total_coins, color=HUD_COLOR,
+                                                                        size_hint=(None, None), size=(200, 50),
+                                                                        pos_hint={'x': 0, 'top': 1}))
         self.add_widget(self.total_coins_label)
-        self.score_label = Label(text=f"Score: {self.score}",
-                                 size_hint=(None, None), size=(200, 50),
-                                 pos_hint={'x': 0, 'top': 0.95},
-                                 disabled=True)
+        self.score_label = self.hud.add('score', HudCounter("Score: ", self.score, color=HUD_COLOR,
+                                                            size_hint=(None, None), size=(200, 50),
+                                                            pos_hint={'x': 0, 'top': 0.95}))
         self.add_widget(self.score_label)
-        self.bind(score=self.update_score_label)
-        self.top_score_label = Label(text=f"Top Score: {App.get_running_app().top_score}",
-                                     size_hint=(None, None), size=(200, 50),
-                                     pos_hint={'x': 0, 'top': 0.90},
-                                     disabled=True)
+        self.top_score_label = self.hud.add('top_score', HudCounter("Top Score: ", app.top_score, color=HUD_COLOR,
+                                                                    size_hint=(None, None), size=(200, 50),
+                                                                    pos_hint={'x': 0, 'top': 0.90}))
         self.add_widget(self.top_score_label)
-        if self.player.character_type == 3:
-            self.heart_label = Label(text=f"Lives: {self.player.lives}",
-                                     size_hint=(None, None), size=(200, 50),
-                                     pos_hint={'x': 0, 'top': 0.85},
-                                     disabled=True)
+        self.bind(score=self.update_score_label)
+        app.bind(total_coins=self.update_total_coins_label, top_score=self.update_top_score_label)
+        if self.player.lives > 1:
+            self.heart_label = self.hud.add('lives', HudCounter("Lives: ", self.player.lives, color=HUD_COLOR,
+                                                                size_hint=(None, None), size=(200, 50),
+                                                                pos_hint={'x': 0, 'top': 0.85}))
             self.add_widget(self.heart_label)
-        Clock.schedule_interval(self.update, 1.0/60.0)
-        Clock.schedule_interval(self.spawn_objects, 2.0)
+        # The update loop starts from reset_game() when the screen is entered.
+        self.update_event = Clock.create_trigger(self.update, 0, interval=True)
+        self.resume_update = False
+        # Touches and jump keys are queued here and applied at the tick
+        # they happened in; flips close the latency measurement.
+        self.inputs = InputQueue()
+        Window.bind(on_flip=self.inputs.on_flip)
+        self.replay = None
+        self.game_over_buttons_list = None
+        self.sim.reset(character=self.player.character)
     def update_score_label(self, instance, value):
-        self.score_label.text = f"Score: {value}"
-        app = App.get_running_app()
-        self.total_coins_label.text = f"Total Coins: {app.total_coins}"
-        self.top_score_label.text = f"Top Score: {app.top_score}"
+        self.hud.set('score', value)
+    def update_total_coins_label(self, instance, value):
+        self.hud.set('total_coins', value)
+    def update_top_score_label(self, instance, value):
+        self.hud.set('top_score', value)
     def update(self, dt):
         if self.game_over:
             return True
-        self.elapsed_time += dt
-        if self.elapsed_time > 10:
-            self.speed_multiplier = 1 + (self.elapsed_time - 10) * 0.1
-        else:
-            self.speed_multiplier = 1
-        self.player.update()
-        for child in self.children[:]:
-            if isinstance(child, (Obstacle, Coin)):
-                child.update()
-                if self.player.collide_widget(child):
-                    if isinstance(child, Coin):
-                        self.score += 1
-                        app = App.get_running_app()
-                        app.total_coins += 1
-                        if self.score > App.get_running_app().top_score:
-                            App.get_running_app().top_score = self.score
-                        print("Coin collected! Score:", self.score, "Total Coins:", app.total_coins)
-                        self.remove_widget(child)
-                    elif isinstance(child, Obstacle):
-                        if self.player.character_type == 3 and self.player.lives > 1:
-                            self.player.lives -= 1
-                            if hasattr(self, 'heart_label'):
-                                self.heart_label.text = f"Lives: {self.player.lives}"
-                            self.remove_widget(child)
-                            print("Hit! Lives left:", self.player.lives)
-                        else:
-                            print("Hit! Game Over. Final Score:", self.score)
-                            self.game_over = True
-                            Clock.unschedule(self.update)
-                            Clock.unschedule(self.spawn_objects)
-                            self.show_game_over_buttons()
+        t0 = time.perf_counter()
+        with UPDATE_SCOPE:
+            sim = self.sim
+            with SIM_SCOPE:
+                sim.advance(dt, self.inputs, t0)
+            self.elapsed_time = sim.elapsed_time
+            self.speed_multiplier = sim.speed_multiplier
+            self.player.y = sim.player.render_y(sim.alpha)
+            with RENDER_SCOPE:
+                self.entity_layer.sync(sim.render_scroll())
+            if profiler.enabled:
+                profiler.count('obstacles', self.obstacles.count)
+                profiler.count('coins', self.coins.count)
+        gc_policy.idle(time.perf_counter() - t0)
         return True
-    def spawn_objects(self, dt):
-        obj_type = random.choice(['obstacle', 'coin'])
-        if obj_type == 'obstacle':
-            obj = Obstacle()
-            obj.pos = (self.width, 0)
-        else:
-            obj = Coin()
-            obj.pos = (self.width, random.randint(50, 100))
-        self.add_widget(obj)
+    def on_coin_collected(self, score):
+        self.score = score
+        app = App.get_running_app()
+        app.total_coins += 1
+        if score > app.top_score:
+            app.top_score = score
+        log.debug("Runner: Coin collected, score %d, total coins %d", score, app.total_coins)
+    def on_player_hit(self, lives):
+        self.player.lives = lives
+        if hasattr(self, 'heart_label'):
+            self.hud.set('lives', lives)
+        log.info("Runner: Hit, %d lives left", lives)
+    def on_game_over(self, score):
+        log.info("Runner: Game over, final score %d", score)
+        self.game_over = True
+        self.update_event.cancel()
+        self.finish_replay()
+        sim = self.sim
+        App.get_running_app().record_run(score, sim.elapsed_time, self.player.character.id, sim.seed, sim.level.id)
+        gc_policy.end_run()
+        self.show_game_over_buttons()
     def on_touch_down(self, touch):
+        # Double-tapping the top-right corner toggles the profiler overlay.
+        if touch.is_double_tap and touch.x > self.right - PROFILER_CORNER and touch.y > self.top - PROFILER_CORNER:
+            App.get_running_app().toggle_profiler()
+            return True
         if not self.game_over:
-            self.player.jump()
+            self.press_jump()
             return True
         return super(RunnerGame, self).on_touch_down(touch)
+    def press_jump(self):
+        if not self.game_over and self.update_event.is_triggered:
+            self.inputs.push()
     def show_game_over_buttons(self):
-        if hasattr(self, 'game_over_buttons_list'):
-            return
-        self.game_over_buttons_list = []
+        # Built once and re-added after every game: each new Button leaves
+        # rule bindings behind in Kivy's Builder.
+        if self.game_over_buttons_list is None:
+            self.game_over_buttons_list = self.build_game_over_buttons()
+        for btn in self.game_over_buttons_list:
+            if btn.parent is None:
+                self.add_widget(btn)
+    def build_game_over_buttons(self):
         play_again = Button(text="Play Again",
                             size_hint=(None, None), size=(200, 50),
                             pos_hint={'center_x': 0.5, 'center_y': 0.4},
@@ -303,41 +225,125 @@ class RunnerGame(FloatLayout):
                            background_normal='',
                            background_color=(0.2, 0.6, 0.8, 1))
         main_menu.bind(on_release=self.go_to_menu)
-        self.game_over_buttons_list.extend([play_again, main_menu])
-        for btn in self.game_over_buttons_list:
-            self.add_widget(btn)
+        return [play_again, main_menu]
     def reset_game(self, instance=None):
-        if hasattr(self, 'game_over_buttons_list'):
-            for btn in self.game_over_buttons_list:
-                self.remove_widget(btn)
-            del self.game_over_buttons_list
+        for btn in self.game_over_buttons_list or ():
+            self.remove_widget(btn)
         self.game_over = False
         self.score = 0
         self.elapsed_time = 0
         self.speed_multiplier = 1
-        self.player.character_type = App.get_running_app().selected_character_type
-        self.player.draw_character()
+        self.player.set_character(App.get_running_app().selected_character_type)
         self.player.pos = (100, 0)
-        self.player.velocity_y = 0
-        for child in self.children[:]:
-            if isinstance(child, (Obstacle, Coin)):
-                self.remove_widget(child)
-        Clock.unschedule(self.update)
-        Clock.unschedule(self.spawn_objects)
-        Clock.schedule_interval(self.update, 1.0/60.0)
-        Clock.schedule_interval(self.spawn_objects, 2.0)
+        if hasattr(self, 'heart_label'):
+            self.hud.set('lives', self.player.lives)
+        # The width is fixed for the whole run so a replay spawns at the
+        # same track positions.
+        self.sim.width = self.width
+        self.sim.reset(character=self.player.character)
+        self.inputs.clear()
+        self.start_replay()
+        self.entity_layer.sync(self.sim.scroll)
+        self.resume_update = False
+        self.update_event.cancel()
+        self.update_event()
+        gc_policy.begin_run()
+    def pause(self):
+        self.bg.pause()
+        self.inputs.clear()
+        if self.update_event.is_triggered:
+            self.update_event.cancel()
+            self.resume_update = True
+    def resume(self):
+        self.bg.resume()
+        if self.resume_update:
+            self.resume_update = False
+            self.update_event()
+    def start_replay(self):
+        # Every run is recorded to replays/last.rpl; a run that beats the
+        # top score is kept as replays/top.rpl for `python replay.py`.
+        self.stop_replay()
+        app = App.get_running_app()
+        self.replay_dir = os.path.join(app.user_data_dir, 'replays')
+        self.top_score_at_start = app.top_score
+        sim = self.sim
+        try:
+            os.makedirs(self.replay_dir, exist_ok=True)
+            self.replay = ReplayWriter(os.path.join(self.replay_dir, 'last.rpl'), sim.seed,
+                                       self.player.character.id, sim.level.id, sim.width)
+        except OSError as e:
+            log.warning("Runner: Replay recording disabled: %s", e)
+            self.replay = None
+        sim.recorder = self.replay
+    def stop_replay(self):
+        if self.replay is not None:
+            self.replay.close()
+            self.replay = None
+            self.sim.recorder = None
+    def finish_replay(self):
+        replay = self.replay
+        if replay is None:
+            return
+        sim = self.sim
+        self.replay = None
+        sim.recorder = None
+        try:
+            replay.finish(sim.tick, sim.score, sim.hits)
+            if sim.score > self.top_score_at_start:
+                shutil.copyfile(replay.path, os.path.join(self.replay_dir, 'top.rpl'))
+        except OSError as e:
+            log.warning("Runner: Saving replay failed: %s", e)
     def go_to_menu(self, instance):
-        Clock.unschedule(self.update)
-        Clock.unschedule(self.spawn_objects)
+        self.update_event.cancel()
+        self.stop_replay()
+        gc_policy.end_run()
         App.get_running_app().root.current = 'menu'
 
 # --- SCREENS ---
-class MainMenuScreen(Screen):
+# Screens that are not shown are suspended: everything registered with
+# add_pausable() is paused (animations, clock events) and touches are
+# ignored until the screen is resumed.
+class LifecycleScreen(Screen):
+    def __init__(self, **kwargs):
+        super(LifecycleScreen, self).__init__(**kwargs)
+        self.pausables = []
+        self.suspended = False
+    def add_pausable(self, pausable):
+        self.pausables.append(pausable)
+        if self.suspended:
+            pausable.pause()
+    def suspend(self):
+        if self.suspended:
+            return
+        self.suspended = True
+        for pausable in self.pausables:
+            pausable.pause()
+    def resume(self):
+        if not self.suspended:
+            return
+        self.suspended = False
+        for pausable in self.pausables:
+            pausable.resume()
+    def on_touch_down(self, touch):
+        if self.suspended:
+            return False
+        return super(LifecycleScreen, self).on_touch_down(touch)
+    def on_touch_move(self, touch):
+        if self.suspended:
+            return False
+        return super(LifecycleScreen, self).on_touch_move(touch)
+    def on_touch_up(self, touch):
+        if self.suspended:
+            return False
+        return super(LifecycleScreen, self).on_touch_up(touch)
+
+class MainMenuScreen(LifecycleScreen):
     def __init__(self, **kwargs):
         super(MainMenuScreen, self).__init__(**kwargs)
         layout = FloatLayout()
-        self.bg = BackgroundWidget(duration=10, size=Window.size, pos=(0, 0))
+        self.bg = ParallaxBackground(duration=10, size=Window.size, pos=(0, 0))
         layout.add_widget(self.bg, index=0)
+        self.add_pausable(self.bg)
         self.add_widget(layout)
         title = Label(text="Runner Game", font_size=32, bold=True,
                       size_hint=(None, None), size=(300, 50),
@@ -359,6 +365,19 @@ class MainMenuScreen(Screen):
                                   font_size=20)
         character_button.bind(on_release=self.go_to_shop)
         layout.add_widget(character_button)
+        players_button = Button(text="Players",
+                                size_hint=(None, None), size=(220, 60),
+                                pos_hint={'center_x': 0.5, 'center_y': 0.4},
+                                background_normal='',
+                                background_color=(0.2, 0.6, 0.8, 1),
+                                font_size=20)
+        players_button.bind(on_release=self.go_to_players)
+        layout.add_widget(players_button)
+        self.profile_label = Label(text=f"Player: {App.get_running_app().profile_name}",
+                                   font_size=24, bold=True,
+                                   size_hint=(None, None), size=(220, 50),
+                                   pos_hint={'x': 0.05, 'top': 0.85})
+        layout.add_widget(self.profile_label)
         self.total_coins_label = Label(text=f"Total Coins: {App.get_running_app().total_coins}",
                                          font_size=24, bold=True,
                                          size_hint=(None, None), size=(220, 50),
@@ -373,52 +392,55 @@ class MainMenuScreen(Screen):
         self.manager.current = 'game'
     def go_to_shop(self, instance):
         self.manager.current = 'shop'
+    def go_to_players(self, instance):
+        self.manager.current = 'players'
     def on_enter(self, *args):
         self.total_coins_label.text = f"Total Coins: {App.get_running_app().total_coins}"
         self.top_score_label.text = f"Top Score: {App.get_running_app().top_score}"
+        self.profile_label.text = f"Player: {App.get_running_app().profile_name}"
 
-class GameScreen(Screen):
+class GameScreen(LifecycleScreen):
     def __init__(self, **kwargs):
         super(GameScreen, self).__init__(**kwargs)
         self.game_widget = RunnerGame()
         self.game_widget.size = Window.size
         self.game_widget.pos = (0, 0)
         self.add_widget(self.game_widget)
+        self.add_pausable(self.game_widget)
     def on_enter(self, *args):
         self.game_widget.reset_game()
-    def on_leave(self, *args):
-        pass
 
-class CharacterShopScreen(Screen):
+class CharacterShopScreen(LifecycleScreen):
     def __init__(self, **kwargs):
         super(CharacterShopScreen, self).__init__(**kwargs)
         layout = FloatLayout()
-        self.bg = BackgroundWidget(duration=10, size=Window.size, pos=(0, 0))
+        self.bg = ParallaxBackground(duration=10, size=Window.size, pos=(0, 0))
         layout.add_widget(self.bg, index=0)
+        self.add_pausable(self.bg)
         self.add_widget(layout)
         title = Label(text="Character Shop", font_size=32, bold=True,
                       size_hint=(None, None), size=(300, 50),
                       pos_hint={'center_x': 0.5, 'top': 1})
         layout.add_widget(title)
-        self.base_texts = {
-            0: "Free Red Square (Free)",
-            1: "White Triangle (25)",
-            2: "Pink Triangle (50)",
-            3: "Red Circle (2 lives) (100)"
-        }
+        self.base_texts = {}
         self.character_buttons = {}
-        for char_type in range(4):
-            y_pos = 0.8 - 0.1 * char_type
+        for index, character in enumerate(App.get_running_app().registry.characters):
+            char_type = character.id
+            self.base_texts[char_type] = character.shop_text
+            y_pos = 0.8 - 0.1 * index
             btn = Button(text=self.base_texts[char_type],
                          size_hint=(None, None), size=(250, 60),
                          pos_hint={'center_x': 0.65, 'center_y': y_pos},
                          background_normal='',
                          background_color=(0.2, 0.6, 0.8, 1),
                          font_size=20)
-            btn.bind(on_release=lambda x, ct=char_type: self.purchase_character(ct, 0 if ct==0 else (25 if ct==1 else (50 if ct==2 else 100))))
+            # A bound method (held weakly by Kivy) rather than a closure
+            # over the screen; the button carries its character.
+            btn.character = character
+            btn.bind(on_release=self.on_character_button)
             self.character_buttons[char_type] = btn
             layout.add_widget(btn)
-            preview = CharacterPreview(character_type=char_type, pos_hint={'center_x': 0.35, 'center_y': y_pos})
+            preview = CharacterPreview(character=character, pos_hint={'center_x': 0.35, 'center_y': y_pos})
             layout.add_widget(preview)
         back_button = Button(text="Back",
                              size_hint=(None, None), size=(220, 60),
@@ -442,6 +464,8 @@ class CharacterShopScreen(Screen):
                 btn.text = base + " ✔"
             else:
                 btn.text = base
+    def on_character_button(self, button):
+        self.purchase_character(button.character.id, button.character.price)
     def purchase_character(self, char_type, cost):
         app = App.get_running_app()
         if char_type in app.unlocked_characters:
@@ -453,7 +477,7 @@ class CharacterShopScreen(Screen):
             if cost == 0 or app.total_coins >= cost:
                 if cost != 0:
                     app.total_coins -= cost
-                app.unlocked_characters.append(char_type)
+                app.unlocked_characters.add(char_type)
                 app.selected_character_type = char_type
                 self.message_label.text = f"Character {char_type} purchased and selected!"
                 self.update_tick_labels()
@@ -462,55 +486,350 @@ class CharacterShopScreen(Screen):
                 self.message_label.text = "Not enough coins!"
     def go_back(self, instance):
         self.manager.current = 'menu'
+    def on_enter(self, *args):
+        # The selection may belong to another player since the last visit.
+        self.message_label.text = ""
+        self.update_tick_labels()
 
+# --- PLAYERS ---
+# Player profiles for shared devices, and the best runs of all players.
+PROFILES_PER_PAGE = 6
+LEADERBOARD_SIZE = 10
+class PlayersScreen(LifecycleScreen):
+    def __init__(self, **kwargs):
+        super(PlayersScreen, self).__init__(**kwargs)
+        layout = FloatLayout()
+        self.bg = ParallaxBackground(duration=10, size=Window.size, pos=(0, 0))
+        layout.add_widget(self.bg, index=0)
+        self.add_pausable(self.bg)
+        self.add_widget(layout)
+        title = Label(text="Players", font_size=32, bold=True,
+                      size_hint=(None, None), size=(300, 50),
+                      pos_hint={'center_x': 0.5, 'top': 1})
+        layout.add_widget(title)
+        self.page = 0
+        self.profile_buttons = []
+        for index in range(PROFILES_PER_PAGE):
+            btn = Button(text="",
+                         size_hint=(None, None), size=(220, 50),
+                         pos_hint={'center_x': 0.25, 'center_y': 0.82 - 0.09 * index},
+                         background_normal='',
+                         background_color=(0.2, 0.6, 0.8, 1),
+                         font_size=18)
+            btn.bind(on_release=self.select_profile)
+            self.profile_buttons.append(btn)
+        self.prev_button = Button(text="<",
+                                  size_hint=(None, None), size=(40, 50),
+                                  pos_hint={'center_x': 0.06, 'center_y': 0.6},
+                                  background_normal='',
+                                  background_color=(0.2, 0.6, 0.8, 1),
+                                  font_size=20)
+        self.prev_button.bind(on_release=self.previous_page)
+        layout.add_widget(self.prev_button)
+        self.next_button = Button(text=">",
+                                  size_hint=(None, None), size=(40, 50),
+                                  pos_hint={'center_x': 0.44, 'center_y': 0.6},
+                                  background_normal='',
+                                  background_color=(0.2, 0.6, 0.8, 1),
+                                  font_size=20)
+        self.next_button.bind(on_release=self.next_page)
+        layout.add_widget(self.next_button)
+        self.name_input = TextInput(hint_text="New player name", multiline=False,
+                                    size_hint=(None, None), size=(220, 40),
+                                    pos_hint={'center_x': 0.25, 'center_y': 0.25})
+        self.name_input.bind(on_text_validate=self.add_profile)
+        layout.add_widget(self.name_input)
+        add_button = Button(text="Add Player",
+                            size_hint=(None, None), size=(220, 50),
+                            pos_hint={'center_x': 0.25, 'center_y': 0.16},
+                            background_normal='',
+                            background_color=(0.2, 0.6, 0.8, 1),
+                            font_size=18)
+        add_button.bind(on_release=self.add_profile)
+        layout.add_widget(add_button)
+        self.message_label = Label(text="", font_size=16, bold=True,
+                                   size_hint=(None, None), size=(300, 30),
+                                   pos_hint={'center_x': 0.25, 'center_y': 0.06})
+        layout.add_widget(self.message_label)
+        self.leaderboard_label = Label(text="", font_size=16, halign='left', valign='top',
+                                       size_hint=(None, None), size=(360, 380),
+                                       pos_hint={'center_x': 0.7, 'top': 0.88})
+        self.leaderboard_label.bind(size=self.leaderboard_label.setter('text_size'))
+        layout.add_widget(self.leaderboard_label)
+        back_button = Button(text="Back",
+                             size_hint=(None, None), size=(220, 60),
+                             pos_hint={'center_x': 0.7, 'center_y': 0.1},
+                             background_normal='',
+                             background_color=(0.2, 0.6, 0.8, 1),
+                             font_size=20)
+        back_button.bind(on_release=self.go_back)
+        layout.add_widget(back_button)
+        self.layout = layout
+        self.refresh()
+    def refresh(self):
+        app = App.get_running_app()
+        store = app.save_store()
+        profiles = store.profiles()
+        pages = max(1, (len(profiles) + PROFILES_PER_PAGE - 1) // PROFILES_PER_PAGE)
+        self.page = min(self.page, pages - 1)
+        start = self.page * PROFILES_PER_PAGE
+        self.prev_button.disabled = self.page == 0
+        self.next_button.disabled = self.page == pages - 1
+        for btn in self.profile_buttons:
+            if btn.parent is not None:
+                self.layout.remove_widget(btn)
+        for btn, (profile_id, name) in zip(self.profile_buttons, profiles[start:start + PROFILES_PER_PAGE]):
+            btn.profile_id = profile_id
+            btn.text = name + (" ✔" if profile_id == app.profile_id else "")
+            self.layout.add_widget(btn)
+        lines = ["Best runs"]
+        for rank, (score, duration, character_id, seed, level, finished, name) in enumerate(
+                store.leaderboard(LEADERBOARD_SIZE), 1):
+            lines.append(f"{rank:2}. {name}  {score}  ({duration:.0f}s)")
+        self.leaderboard_label.text = "\n".join(lines)
+    def select_profile(self, button):
+        App.get_running_app().switch_profile(button.profile_id)
+        self.refresh()
+    def previous_page(self, instance):
+        self.page -= 1
+        self.refresh()
+    def next_page(self, instance):
+        self.page += 1
+        self.refresh()
+    def add_profile(self, instance):
+        app = App.get_running_app()
+        name = self.name_input.text.strip()
+        if not name:
+            self.message_label.text = "Enter a name first"
+            return
+        store = app.save_store()
+        try:
+            profile_id = store.create_profile(name)
+        except sqlite3.IntegrityError:
+            self.message_label.text = f"{name} already exists"
+            return
+        self.name_input.text = ""
+        self.message_label.text = f"{name} added"
+        app.switch_profile(profile_id)
+        # Show the page the new player landed on.
+        ids = [row[0] for row in store.profiles()]
+        self.page = ids.index(profile_id) // PROFILES_PER_PAGE
+        self.refresh()
+    def go_back(self, instance):
+        self.manager.current = 'menu'
+    def on_enter(self, *args):
+        self.message_label.text = ""
+        self.refresh()
+
+# Screens are registered as factories and built the first time they are
+# navigated to, or ahead of time by prewarm() during idle frames.
 class RunnerScreenManager(ScreenManager):
-    pass
+    def __init__(self, **kwargs):
+        super(RunnerScreenManager, self).__init__(**kwargs)
+        self.factories = {}
+        self.bind(current_screen=self._on_current_screen)
+    def register(self, name, factory):
+        self.factories[name] = factory
+    def ensure_screen(self, name):
+        factory = self.factories.pop(name, None)
+        if factory is not None:
+            with startup.phase(f"screen:{name}"):
+                screen = factory(name=name)
+            if name != self.current:
+                # Prewarmed screens stay idle until they are shown.
+                screen.suspend()
+            self.add_widget(screen)
+        return self.get_screen(name)
+    def _on_current_screen(self, instance, screen):
+        # current_screen switches when a transition starts: the outgoing
+        # screen stops animating and taking input right away. A transition
+        # is also a good moment for a full collection.
+        for other in self.screens:
+            if other is not screen:
+                other.suspend()
+        if not gc_policy.running:
+            gc_policy.collect()
+        if screen is not None:
+            screen.resume()
+    def suspend(self):
+        if self.current_screen is not None:
+            self.current_screen.suspend()
+    def resume(self):
+        if self.current_screen is not None:
+            self.current_screen.resume()
+    def on_current(self, instance, value):
+        if value in self.factories:
+            self.ensure_screen(value)
+        super(RunnerScreenManager, self).on_current(instance, value)
+    def prewarm(self, delay=0.5):
+        if self.factories:
+            Clock.schedule_once(self._prewarm_next, delay)
+    def _prewarm_next(self, dt):
+        # Nothing is built or frozen while a run is going; check again later.
+        if gc_policy.running:
+            Clock.schedule_once(self._prewarm_next, PREWARM_RETRY)
+            return
+        # One screen per idle frame, so no single frame takes the whole cost.
+        if self.factories:
+            self.ensure_screen(next(iter(self.factories)))
+            Clock.schedule_once(self._prewarm_next, 0)
+        else:
+            # The new screens are long-lived too.
+            gc_policy.freeze()
 
 # --- APP ---
 class RunnerApp(App):
     total_coins = NumericProperty(0)
+    profile_id = NumericProperty(0)
+    profile_name = StringProperty("")
     selected_character_type = NumericProperty(0)  # Default: 0 (free red square)
     top_score = NumericProperty(0)
+    # Build the screens not visited yet in idle frames after the first one.
+    prewarm_screens = True
     def build(self):
-        # Eğer progress yüklenmişse, unlocked_characters korunmalı, aksi halde tanımla.
-        if not hasattr(self, 'unlocked_characters'):
-            self.unlocked_characters = [0]  # Ücretsiz karakter her zaman açık
-        sm = RunnerScreenManager()
-        sm.add_widget(MainMenuScreen(name='menu'))
-        sm.add_widget(GameScreen(name='game'))
-        sm.add_widget(CharacterShopScreen(name='shop'))
+        # Progress is normally loaded before run(); a player must be active
+        # before any screen reads it.
+        if not self.profile_name:
+            self.load_progress()
+        with startup.phase('registry'):
+            self.registry = load_registry(cache_dir=os.path.join(self.user_data_dir, 'cache'))
+        with startup.phase('sprites'):
+            self.sprites = SpriteAtlas(self.registry.characters, cache_dir=os.path.join(self.user_data_dir, 'cache'))
+        with startup.phase('build'):
+            sm = RunnerScreenManager()
+            sm.register('menu', MainMenuScreen)
+            sm.register('game', GameScreen)
+            sm.register('shop', CharacterShopScreen)
+            sm.register('players', PlayersScreen)
+            sm.current = 'menu'
+        self.profiler_overlay = None
+        # Jump keys held down (auto-repeat does not jump again).
+        self.keys_down = set()
+        Window.bind(on_key_down=self.on_key_down, on_key_up=self.on_key_up)
+        # Everything built so far lives as long as the app; keep it out of
+        # later collections.
+        with startup.phase('gc_freeze'):
+            gc_policy.install()
+            gc_policy.freeze()
         return sm
-    def on_stop(self):
-        data = {
+    def on_start(self):
+        Clock.schedule_once(self.on_first_frame, 0)
+    def on_pause(self):
+        # The OS may kill a paused app without calling on_stop.
+        self.root.suspend()
+        store = self.progress_store()
+        store.save(self.progress_data())
+        store.flush()
+        gc_policy.collect()
+        return True
+    def on_resume(self):
+        self.root.resume()
+    def on_first_frame(self, dt):
+        startup.mark('first_frame')
+        log.info("Startup: phases\n%s", startup.format())
+        if self.prewarm_screens:
+            self.root.prewarm()
+    def on_key_down(self, window, key, *args):
+        if key == KEY_F3:
+            self.toggle_profiler()
+            return True
+        if key == KEY_F4:
+            self.export_trace()
+            return True
+        if key in JUMP_KEYS and self.root is not None and self.root.current == 'game':
+            if key not in self.keys_down:
+                self.keys_down.add(key)
+                self.root.get_screen('game').game_widget.press_jump()
+            return True
+    def on_key_up(self, window, key, *args):
+        self.keys_down.discard(key)
+    def toggle_profiler(self):
+        overlay = self.profiler_overlay
+        if overlay is None:
+            overlay = self.profiler_overlay = ProfilerOverlay()
+        if overlay.visible:
+            overlay.hide()
+            Window.remove_widget(overlay)
+        else:
+            if self.root.has_screen('game'):
+                overlay.inputs = self.root.get_screen('game').game_widget.inputs
+            overlay.pos = (Window.width - overlay.width, Window.height - overlay.height)
+            Window.add_widget(overlay)
+            overlay.show()
+    def export_trace(self):
+        trace_dir = os.path.join(self.user_data_dir, 'traces')
+        path = os.path.join(trace_dir, time.strftime('trace-%Y%m%d-%H%M%S.json'))
+        try:
+            os.makedirs(trace_dir, exist_ok=True)
+            count = profiler.export_chrome_trace(path)
+        except OSError as e:
+            log.error("Runner: Writing trace failed: %s", e)
+            return
+        log.info("Runner: Wrote %d trace events to %s", count, path)
+    def save_store(self):
+        if getattr(self, '_save_store', None) is None:
+            self._save_store = SaveStore(os.path.join(self.user_data_dir, "saves.db"))
+            # Older versions kept a single player's progress in progress.json.
+            json_store = ProgressStore(os.path.join(self.user_data_dir, "progress.json"))
+            self._save_store.migrate(json_store.load)
+        return self._save_store
+    def progress_store(self):
+        if getattr(self, '_progress_store', None) is None:
+            save_store = self.save_store()
+            self._progress_store = ProgressStore(save_store.path, writer=save_store.write_snapshot)
+            self._progress_store.on_error = self.on_save_error
+        return self._progress_store
+    def progress_data(self):
+        # Snapshot taken on the UI thread; the writer thread only sees copies.
+        return {
+            'profile_id': self.profile_id,
             'total_coins': self.total_coins,
             'selected_character_type': self.selected_character_type,
-            'unlocked_characters': self.unlocked_characters,
+            'unlocked_characters': sorted(self.unlocked_characters),
             'top_score': self.top_score
         }
-        progress_path = os.path.join(self.user_data_dir, "progress.json")
-        with open(progress_path, "w") as f:
-            json.dump(data, f)
+    def on_stop(self):
+        root = self.root
+        if root is not None and root.has_screen('game'):
+            game = root.get_screen('game').game_widget
+            game.stop_replay()
+            game.sim.scheduler.stop()
+        store = self.progress_store()
+        store.save(self.progress_data())
+        store.close()
+        self.save_store().close()
+    def on_save_error(self, error):
+        log.error("Runner: Saving progress failed: %s", error)
     def load_progress(self):
-        progress_path = os.path.join(self.user_data_dir, "progress.json")
-        if os.path.exists(progress_path):
-            with open(progress_path, "r") as f:
-                data = json.load(f)
-                self.total_coins = data.get("total_coins", 0)
-                self.selected_character_type = data.get("selected_character_type", 0)
-                self.unlocked_characters = data.get("unlocked_characters", [0])
-                self.top_score = data.get("top_score", 0)
+        store = self.save_store()
+        self.apply_profile(store.load(store.active_profile()))
+    def apply_profile(self, data):
+        self.profile_id = data['profile_id']
+        self.profile_name = data['name']
+        self.total_coins = data['total_coins']
+        self.selected_character_type = data['selected_character_type']
+        self.unlocked_characters = data['unlocked_characters']
+        self.top_score = data['top_score']
+    def switch_profile(self, profile_id):
+        if profile_id == self.profile_id:
+            return
+        # Write the current player's progress before loading the next one.
+        progress = self.progress_store()
+        progress.save(self.progress_data())
+        progress.flush()
+        store = self.save_store()
+        store.set_active_profile(profile_id)
+        self.apply_profile(store.load(profile_id))
+    def record_run(self, score, duration, character_id, seed, level):
+        # Inserted with the next progress write, in the same transaction.
+        self.save_store().queue_run(Run(self.profile_id, score, duration, character_id, seed, level))
+        self.save_progress()
     def save_progress(self):
-        data = {
-            'total_coins': self.total_coins,
-            'selected_character_type': self.selected_character_type,
-            'unlocked_characters': self.unlocked_characters,
-            'top_score': self.top_score
-        }
-        progress_path = os.path.join(self.user_data_dir, "progress.json")
-        with open(progress_path, "w") as f:
-            json.dump(data, f)
+        # Debounced; the write happens later on the store's worker thread.
+        self.progress_store().save(self.progress_data())
 
 if __name__ == '__main__':
     app = RunnerApp()
-    app.load_progress()
+    with startup.phase('load_progress'):
+        app.load_progress()
     app.run()
@@ -0,0 +1,98 @@
+from kivy.uix.widget import Widget
+from kivy.core.text import Label as CoreLabel
+from kivy.graphics import Color, Rectangle
+from kivy.clock import Clock
+from kivy.metrics import sp, dp
+from instrument import profiler
+
+HIST_BINS = 16
+HIST_MAX_MS = 50.0
+# Bars for frames slower than this are drawn in red.
+BUDGET_MS = 1000.0 / 60.0
+# The text is rebuilt a few times a second, not every frame.
+TEXT_INTERVAL = 0.25
+
+# --- PROFILER OVERLAY ---
+# FPS, frame-time histogram, per-scope ms, counters and GC pauses from the
+# profiler's ring buffer, and input latency (mean, p95, max) from the game's
+# InputQueue when `inputs` is set. The profiler is enabled only while it is
+# shown.
+class ProfilerOverlay(Widget):
+    def __init__(self, **kwargs):
+        super(ProfilerOverlay, self).__init__(**kwargs)
+        self.size_hint = (None, None)
+        self.size = (dp(250), dp(270))
+        self.visible = False
+        self.inputs = None
+        self.frame_event = None
+        self.text_event = None
+        bar_width = HIST_MAX_MS / (HIST_BINS - 1)
+        self.bars = []
+        with self.canvas:
+            Color(0, 0, 0, 0.6)
+            self.bg_rect = Rectangle()
+            for k in range(HIST_BINS):
+                if k * bar_width < BUDGET_MS:
+                    Color(0.3, 1, 0.3, 0.9)
+                else:
+                    Color(1, 0.3, 0.3, 0.9)
+                self.bars.append(Rectangle(size=(0, 0)))
+            Color(1, 1, 1, 1)
+            self.text_rect = Rectangle(size=(0, 0))
+        self.bind(pos=self.layout, size=self.layout)
+    def show(self):
+        if self.visible:
+            return
+        self.visible = True
+        profiler.reset()
+        profiler.enable()
+        self.frame_event = Clock.schedule_interval(self.on_frame, 0)
+        self.text_event = Clock.schedule_interval(self.refresh, TEXT_INTERVAL)
+    def hide(self):
+        if not self.visible:
+            return
+        self.visible = False
+        self.frame_event.cancel()
+        self.text_event.cancel()
+        profiler.disable()
+    def on_frame(self, dt):
+        profiler.end_frame(dt)
+    def layout(self, *args):
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
+        self.refresh()
+    def refresh(self, *args):
+        summary = profiler.summary()
+        if summary is None:
+            return
+        pad = dp(6)
+        hist_height = dp(50)
+        counts = profiler.histogram(HIST_BINS, HIST_MAX_MS)
+        peak = max(counts) or 1
+        bar_w = (self.width - 2 * pad) / HIST_BINS
+        for k, bar in enumerate(self.bars):
+            bar.pos = (self.x + pad + k * bar_w, self.y + pad)
+            bar.size = (bar_w - 1, hist_height * counts[k] / peak)
+        lines = [
+            f"FPS {summary['fps']:.1f}  frame {summary['frame_ms_mean']:.2f} ms",
+            f"p95 {summary['frame_ms_p95']:.2f} ms  max {summary['frame_ms_max']:.2f} ms",
+            f"GC max {summary['gc_ms_max']:.2f} ms  total {summary['gc_ms_total']:.2f} ms",
+        ]
+        for name, ms in sorted(summary['scopes_ms'].items()):
+            lines.append(f"{name:12} {ms:7.3f} ms")
+        for name, value in sorted(summary['counters'].items()):
+            lines.append(f"{name:12} {value:7.0f}")
+        if self.inputs is not None:
+            latency = self.inputs.latency()
+            # Event to the tick that took it, and to the next buffer flip.
+            for label, name in (('input>tick', 'tick_ms'), ('input>flip', 'flip_ms')):
+                if latency[name] is not None:
+                    mean, p95, worst = latency[name]
+                    lines.append(f"{label:10} {mean:5.1f} p95 {p95:5.1f} max {worst:5.1f} ms")
+            lines.append(f"{'merged':12} {self.inputs.coalesced:7d}")
+        label = CoreLabel(text="\n".join(lines), font_size=sp(11), font_name='RobotoMono-Regular')
+        label.refresh()
+        texture = label.texture
+        self.text_rect.texture = texture
+        self.text_rect.size = texture.size
+        self.text_rect.pos = (self.x + pad, self.top - pad - texture.height)
@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+FORMAT_VERSION = 1
+
+# --- SNAPSHOT FORMAT ---
+# {"version": 1, "checksum": "<sha256 of data>", "data": {...}}
+# Files written before the header existed hold the bare data dict and are
+# still accepted.
+def checksum(data):
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def encode(data):
+    return json.dumps({'version': FORMAT_VERSION, 'checksum': checksum(data), 'data': data})
+
+def decode(text):
+    doc = json.loads(text)
+    if not isinstance(doc, dict):
+        raise ValueError("progress file does not hold an object")
+    if 'checksum' not in doc:
+        return doc
+    if doc.get('version') != FORMAT_VERSION:
+        raise ValueError(f"unsupported progress version {doc.get('version')!r}")
+    data = doc.get('data')
+    if not isinstance(data, dict) or checksum(data) != doc['checksum']:
+        raise ValueError("progress checksum mismatch")
+    return data
+
+def write_atomic(path, text):
+    # Write to a temp file, fsync it, keep the previous good file as .bak
+    # and rename the new one into place. A crash at any point leaves either
+    # the old or the new snapshot readable.
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    if os.path.exists(path):
+        os.replace(path, path + '.bak')
+    os.replace(tmp_path, path)
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+# --- PROGRESS STORE ---
+# Saves are coalesced: save() only records the latest snapshot, and a
+# background thread writes it once no newer save has arrived for
+# `debounce` seconds (or after `max_delay` at the latest). Nothing in
+# save() touches the disk, so it is safe to call from the UI thread.
+# Snapshots go to `path` as atomic JSON files, or to `writer(data)` when
+# one is given (e.g. SaveStore.write_snapshot).
+class ProgressStore(object):
+    def __init__(self, path, debounce=0.5, max_delay=2.0, writer=None):
+        self.path = path
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.writer = writer
+        # Called with the exception if a background write fails.
+        self.on_error = None
+        self._cond = threading.Condition()
+        self._writing = False
+        self._pending = None
+        self._first_pending = 0.0
+        self._due = 0.0
+        self._closed = False
+        self._thread = None
+    def load(self, default=None):
+        # A complete .tmp is newer than .bak: the write stopped before rename.
+        for path in (self.path, self.path + '.tmp', self.path + '.bak'):
+            try:
+                with open(path, 'r') as f:
+                    return decode(f.read())
+            except (OSError, ValueError):
+                # Missing, truncated or corrupt: fall back to the next one.
+                continue
+        return default
+    def save(self, data):
+        now = time.monotonic()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ProgressStore is closed")
+            if self._pending is None:
+                self._first_pending = now
+            self._pending = data
+            self._due = min(now + self.debounce, self._first_pending + self.max_delay)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='progress-writer', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+    def flush(self):
+        # Writes any pending snapshot now, on the calling thread, after any
+        # write the worker already has in flight. Failures go to on_error,
+        # as on the worker, never up into the caller (e.g. App.on_pause).
+        data = self._take(wait=False)
+        if data is not None:
+            self._save(data)
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+    def _take(self, wait):
+        with self._cond:
+            while True:
+                if self._writing:
+                    self._cond.wait()
+                    continue
+                if not wait:
+                    break
+                if self._closed:
+                    return None
+                if self._pending is None:
+                    self._cond.wait()
+                    continue
+                delay = self._due - time.monotonic()
+                if delay <= 0:
+                    break
+                self._cond.wait(delay)
+            data = self._pending
+            self._pending = None
+            if data is not None:
+                self._writing = True
+            return data
+    def _write(self, data):
+        try:
+            if self.writer is not None:
+                self.writer(data)
+            else:
+                write_atomic(self.path, encode(data))
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+    def _save(self, data):
+        try:
+            self._write(data)
+        except (OSError, sqlite3.Error) as e:
+            if self.on_error is not None:
+                self.on_error(e)
+    def _run(self):
+        while True:
+            data = self._take(wait=True)
+            if data is None:
+                return
+            self._save(data)
@@ -0,0 +1,133 @@
+import os
+import json
+import pickle
+
+DATA_VERSION = 1
+# Bump when the definition classes change so stale caches are rebuilt.
+CACHE_VERSION = 5
+SHAPE_TYPES = ('rectangle', 'triangle', 'ellipse')
+ENTITY_KINDS = ('obstacle', 'coin')
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'game_data.json')
+
+# --- DEFINITIONS ---
+class ShapeDef(object):
+    __slots__ = ('type', 'color', 'grow')
+    def __init__(self, type, color, grow=0):
+        if type not in SHAPE_TYPES:
+            raise ValueError(f"unknown shape type {type!r}")
+        self.type = type
+        self.color = tuple(color)
+        self.grow = grow
+
+class CharacterDef(object):
+    __slots__ = ('id', 'name', 'price', 'lives', 'hitbox', 'shapes')
+    def __init__(self, id, name, price, lives, hitbox, shapes):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.lives = lives
+        self.hitbox = tuple(hitbox)
+        self.shapes = shapes
+    @property
+    def shop_text(self):
+        return f"{self.name} ({'Free' if self.price == 0 else self.price})"
+
+class SpawnRule(object):
+    __slots__ = ('kind', 'weight', 'y_min', 'y_max', 'count_min', 'count_max')
+    def __init__(self, kind, weight, y, count=(1, 1)):
+        if kind not in ENTITY_KINDS:
+            raise ValueError(f"unknown spawn kind {kind!r}")
+        self.kind = kind
+        self.weight = weight
+        self.y_min, self.y_max = y
+        # Entities per group, placed side by side.
+        self.count_min, self.count_max = count
+
+class LevelDef(object):
+    __slots__ = ('id', 'gravity', 'jump_velocity', 'jump_buffer', 'coyote_time', 'scroll_speed',
+                 'speed_base', 'ramp_start', 'ramp_rate', 'obstacle_size', 'coin_size',
+                 'spawn_interval', 'lookahead', 'fair_spacing', 'spawn_table')
+    def __init__(self, id, gravity, jump_velocity, scroll_speed, speed_curve,
+                 obstacle_size, coin_size, spawn, jump_buffer=0.1, coyote_time=0.08):
+        self.id = id
+        self.gravity = gravity
+        self.jump_velocity = jump_velocity
+        # Seconds a jump pressed in the air is kept until landing, and
+        # seconds after leaving the ground (other than by jumping) that a
+        # jump still works.
+        self.jump_buffer = jump_buffer
+        self.coyote_time = coyote_time
+        self.scroll_speed = scroll_speed
+        self.speed_base = speed_curve['base']
+        self.ramp_start = speed_curve['ramp_start']
+        self.ramp_rate = speed_curve['ramp_rate']
+        self.obstacle_size = tuple(obstacle_size)
+        self.coin_size = tuple(coin_size)
+        self.spawn_interval = spawn['interval']
+        # Seconds of track generated ahead of the player.
+        self.lookahead = spawn.get('lookahead', 3.0)
+        # False for stress levels: groups are not spaced or capped so the
+        # player can get through (chunks.ChunkGenerator).
+        self.fair_spacing = spawn.get('fair', True)
+        self.spawn_table = [SpawnRule(**rule) for rule in spawn['table']]
+
+class Registry(object):
+    def __init__(self, characters, levels):
+        self.characters = sorted(characters, key=lambda c: c.id)
+        self.levels = dict((level.id, level) for level in levels)
+        self._by_id = dict((c.id, c) for c in self.characters)
+    def character(self, character_id):
+        # Unknown ids (e.g. from an older save) fall back to the first,
+        # free character.
+        return self._by_id.get(character_id, self.characters[0])
+    def level(self, level_id='default'):
+        return self.levels[level_id]
+
+# --- LOADING ---
+def parse(doc):
+    if doc.get('version') != DATA_VERSION:
+        raise ValueError(f"unsupported game data version {doc.get('version')!r}")
+    characters = []
+    for entry in doc['characters']:
+        entry = dict(entry)
+        entry['shapes'] = [ShapeDef(**shape) for shape in entry['shapes']]
+        characters.append(CharacterDef(**entry))
+    if not characters:
+        raise ValueError("game data defines no characters")
+    levels = [LevelDef(**entry) for entry in doc['levels']]
+    return Registry(characters, levels)
+
+_loaded = {}
+
+def load_registry(path=DEFAULT_PATH, cache_dir=None):
+    # Parsed registries are cached in memory and, with cache_dir, pickled to
+    # disk keyed by the data file's size and mtime.
+    st = os.stat(path)
+    key = (CACHE_VERSION, st.st_size, st.st_mtime_ns)
+    cached = _loaded.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    cache_path = None
+    registry = None
+    if cache_dir is not None:
+        cache_path = os.path.join(cache_dir, os.path.basename(path) + '.pickle')
+        try:
+            with open(cache_path, 'rb') as f:
+                cached_key, registry = pickle.load(f)
+            if cached_key != key:
+                registry = None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            registry = None
+    if registry is None:
+        with open(path, 'r') as f:
+            registry = parse(json.load(f))
+        if cache_path is not None:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(cache_path + '.tmp', 'wb') as f:
+                    pickle.dump((key, registry), f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(cache_path + '.tmp', cache_path)
+            except OSError:
+                pass
+    _loaded[path] = (key, registry)
+    return registry
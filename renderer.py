@@ -0,0 +1,115 @@
+from array import array
+from kivy.uix.widget import Widget
+from kivy.graphics import Color, Mesh, InstructionGroup, PushMatrix, PopMatrix, Translate
+
+# Vertex layout is Kivy's default Mesh format: x, y, u, v per vertex.
+FLOATS_PER_QUAD = 16
+INDICES_PER_QUAD = 6
+# Mesh indices are unsigned shorts.
+MAX_QUADS = 65536 // 4
+
+# --- QUAD BATCH ---
+# All live entities of one pool, drawn as a single Mesh under one Color.
+# Entities do not move in track space, so vertices are rewritten (in place,
+# in a flat float array handed to the Mesh as a memoryview slice covering
+# only the live quads) only when a spawn or release changed the pool;
+# otherwise a frame moves one Translate. Vertices are relative to the
+# scroll at the last rewrite, which keeps them small for float32.
+class QuadBatch(object):
+    def __init__(self, pool, color):
+        self.pool = pool
+        self.group = InstructionGroup()
+        self.group.add(PushMatrix())
+        self.translate = Translate(0, 0)
+        self.group.add(self.translate)
+        self.group.add(Color(*color))
+        self.mesh = Mesh(mode='triangles')
+        self.group.add(self.mesh)
+        self.group.add(PopMatrix())
+        self.capacity = 0
+        self.drawn = -1
+        self.origin = 0.0
+        # (spawned, released) of the pool when the vertices were written.
+        self.version = None
+        self._reserve(pool.capacity)
+    def _reserve(self, capacity):
+        if capacity > MAX_QUADS:
+            raise ValueError(f"QuadBatch supports at most {MAX_QUADS} quads, got {capacity}")
+        # The Mesh holds views on these arrays, so growing means new arrays
+        # rather than extending the old ones in place.
+        self.vertices = array('f', bytes(4 * FLOATS_PER_QUAD * capacity))
+        indices = self.indices = array('H', bytes(2 * INDICES_PER_QUAD * capacity))
+        for q in range(capacity):
+            base = 4 * q
+            k = INDICES_PER_QUAD * q
+            indices[k] = base
+            indices[k + 1] = base + 1
+            indices[k + 2] = base + 2
+            indices[k + 3] = base + 2
+            indices[k + 4] = base + 3
+            indices[k + 5] = base
+        self.capacity = capacity
+        self.drawn = -1
+        self.version = None
+    def update(self, scroll):
+        pool = self.pool
+        version = (pool.spawned, pool.released)
+        if version != self.version:
+            self.version = version
+            self._rebuild(scroll)
+        self.translate.x = self.origin - scroll
+    def _rebuild(self, origin):
+        pool = self.pool
+        if pool.capacity > self.capacity:
+            self._reserve(pool.capacity)
+        self.origin = origin
+        v = self.vertices
+        xs = pool.x
+        ys = pool.y
+        alive = pool.alive
+        w = pool.width
+        h = pool.height
+        k = 0
+        for i in range(pool.capacity):
+            if not alive[i]:
+                continue
+            x = xs[i] - origin
+            y = ys[i]
+            v[k] = x
+            v[k + 1] = y
+            v[k + 4] = x + w
+            v[k + 5] = y
+            v[k + 8] = x + w
+            v[k + 9] = y + h
+            v[k + 12] = x
+            v[k + 13] = y + h
+            k += FLOATS_PER_QUAD
+        n = k // FLOATS_PER_QUAD
+        mesh = self.mesh
+        if n != self.drawn:
+            self.drawn = n
+            if n:
+                self._vertex_view = memoryview(v)[:k]
+                mesh.indices = memoryview(self.indices)[:INDICES_PER_QUAD * n]
+            else:
+                # Kivy rejects zero-length views; an empty Mesh takes lists.
+                self._vertex_view = None
+                mesh.indices = []
+                mesh.vertices = []
+        if n:
+            # Reassigning the same view flags the buffer for upload.
+            mesh.vertices = self._vertex_view
+
+# --- ENTITY RENDERER ---
+class EntityRenderer(Widget):
+    def __init__(self, pools, **kwargs):
+        super(EntityRenderer, self).__init__(**kwargs)
+        self.batches = []
+        for pool, color in pools:
+            batch = QuadBatch(pool, color)
+            self.canvas.add(batch.group)
+            self.batches.append(batch)
+        self.sync()
+    def sync(self, scroll=0):
+        for batch in self.batches:
+            batch.update(scroll)
@@ -0,0 +1,166 @@
+import os
+import sys
+import time
+import struct
+import argparse
+from array import array
+
+from simulation import Simulation
+from registry import load_registry
+
+# --- FORMAT ---
+# Little-endian binary:
+#   header  magic "RPLY", version u16, character id u16, screen width f64,
+#           seed u64, level id (16 bytes, NUL padded)
+#   body    one u32 per jump input: the simulation tick it was pressed on
+#   footer  END_MARKER u32, final tick u32, score u32, hits u32
+# A replay without a footer was abandoned (app closed mid-run).
+MAGIC = b'RPLY'
+# Version 2: track generated in chunks (chunks.py) instead of timed spawns.
+# Version 3: presses are buffered (jump buffer, coyote time) instead of
+# dropped in the air.
+REPLAY_VERSION = 3
+HEADER = struct.Struct('<4sHHdQ16s')
+FOOTER = struct.Struct('<III')
+END_MARKER = 0xFFFFFFFF
+
+class ReplayError(Exception):
+    pass
+
+# --- WRITER ---
+# Jump ticks go into a preallocated array and reach the file only when it
+# fills up or the run ends, so recording costs one store per input.
+class ReplayWriter(object):
+    def __init__(self, path, seed, character_id, level_id, width, buffer_size=256):
+        self.path = path
+        self.buffer = array('I', bytes(4 * buffer_size))
+        self.count = 0
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, REPLAY_VERSION, character_id, width, seed,
+                                    level_id.encode('utf-8')[:16]))
+    def record_jump(self, tick):
+        self.buffer[self.count] = tick
+        self.count += 1
+        if self.count == len(self.buffer):
+            self._flush()
+    def _flush(self):
+        if self.count:
+            if sys.byteorder == 'big':
+                words = self.buffer[:self.count]
+                words.byteswap()
+            else:
+                words = memoryview(self.buffer)[:self.count]
+            self.file.write(words)
+            self.count = 0
+    def finish(self, tick, score, hits):
+        self._flush()
+        self.file.write(struct.pack('<I', END_MARKER))
+        self.file.write(FOOTER.pack(tick, score, hits))
+        self.close()
+    def close(self):
+        if self.file is not None:
+            self._flush()
+            self.file.close()
+            self.file = None
+
+# --- READER ---
+class Replay(object):
+    __slots__ = ('seed', 'character_id', 'level_id', 'width', 'jumps', 'final')
+    def __init__(self, seed, character_id, level_id, width, jumps, final=None):
+        self.seed = seed
+        self.character_id = character_id
+        self.level_id = level_id
+        self.width = width
+        self.jumps = jumps
+        # (tick, score, hits), or None for an abandoned run.
+        self.final = final
+
+def read_replay(path):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if len(raw) < HEADER.size:
+        raise ReplayError(f"{path}: too short for a replay header")
+    magic, version, character_id, width, seed, level_id = HEADER.unpack_from(raw, 0)
+    if magic != MAGIC:
+        raise ReplayError(f"{path}: not a replay file")
+    if version != REPLAY_VERSION:
+        raise ReplayError(f"{path}: replay version {version} is not supported (expected {REPLAY_VERSION})")
+    body = raw[HEADER.size:]
+    if len(body) % 4:
+        raise ReplayError(f"{path}: truncated replay body")
+    words = array('I')
+    words.frombytes(body)
+    if sys.byteorder == 'big':
+        words.byteswap()
+    final = None
+    jumps = words
+    if END_MARKER in words:
+        end = words.index(END_MARKER)
+        if len(words) - end - 1 != 3:
+            raise ReplayError(f"{path}: malformed replay footer")
+        final = tuple(words[end + 1:])
+        jumps = words[:end]
+    return Replay(seed, character_id, level_id.rstrip(b'\0').decode('utf-8'), width, jumps, final)
+
+# --- HEADLESS REPLAY ---
+def simulate(replay, registry=None):
+    registry = registry or load_registry()
+    character = registry.character(replay.character_id)
+    sim = Simulation(width=replay.width, seed=replay.seed,
+                     level=registry.level(replay.level_id), character=character)
+    end_tick = replay.final[0] if replay.final is not None else None
+    for tick in replay.jumps:
+        while sim.tick < tick and not sim.game_over:
+            sim.step()
+        if sim.game_over:
+            break
+        sim.jump()
+    while not sim.game_over and (end_tick is None or sim.tick < end_tick):
+        sim.step()
+    return sim
+
+class VerifyResult(object):
+    def __init__(self, replay, sim, seconds):
+        self.replay = replay
+        self.actual = (sim.tick, sim.score, sim.hits)
+        self.expected = replay.final
+        self.seconds = seconds
+        self.ok = self.expected is not None and self.expected == self.actual
+    @property
+    def speedup(self):
+        # Simulated seconds per wall-clock second.
+        return (self.actual[0] / 60.0) / self.seconds if self.seconds else float('inf')
+
+def verify_replay(path, registry=None):
+    replay = read_replay(path)
+    t0 = time.perf_counter()
+    sim = simulate(replay, registry)
+    return VerifyResult(replay, sim, time.perf_counter() - t0)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify recorded RunnerGame replays headlessly")
+    parser.add_argument('replays', nargs='+')
+    args = parser.parse_args(argv)
+    failures = 0
+    for path in args.replays:
+        try:
+            result = verify_replay(path)
+        except (OSError, ReplayError) as e:
+            print(f"{path}: ERROR {e}")
+            failures += 1
+            continue
+        if result.expected is None:
+            status = 'INCOMPLETE'
+            failures += 1
+        elif result.ok:
+            status = 'OK'
+        else:
+            status = 'MISMATCH'
+            failures += 1
+        tick, score, hits = result.actual
+        print(f"{os.path.basename(path)}: {status} tick={tick} score={score} hits={hits} "
+              f"expected={result.expected} ({result.speedup:.0f}x real time)")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import time
+import sqlite3
+import threading
+
+SCHEMA_VERSION = 1
+DEFAULT_PROFILE = "Player 1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    total_coins INTEGER NOT NULL DEFAULT 0,
+    selected_character INTEGER NOT NULL DEFAULT 0,
+    top_score INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS unlocks (
+    profile_id INTEGER NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    character_id INTEGER NOT NULL,
+    PRIMARY KEY (profile_id, character_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    profile_id INTEGER NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    score INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    character_id INTEGER NOT NULL,
+    seed INTEGER NOT NULL,
+    level TEXT NOT NULL,
+    finished REAL NOT NULL
+);
+-- Top-N over all runs and per profile are index walks, not sorts.
+CREATE INDEX IF NOT EXISTS runs_by_score ON runs (score DESC, finished);
+CREATE INDEX IF NOT EXISTS runs_by_profile_score ON runs (profile_id, score DESC, finished);
+"""
+
+LEADERBOARD_SQL = """
+SELECT r.score, r.duration, r.character_id, r.seed, r.level, r.finished, p.name
+FROM runs r JOIN profiles p ON p.id = r.profile_id
+{where}
+ORDER BY r.score DESC, r.finished
+LIMIT ?
+"""
+
+class Run(object):
+    __slots__ = ('profile_id', 'score', 'duration', 'character_id', 'seed', 'level', 'finished')
+    def __init__(self, profile_id, score, duration, character_id, seed, level, finished=None):
+        self.profile_id = profile_id
+        self.score = score
+        self.duration = duration
+        self.character_id = character_id
+        self.seed = seed
+        self.level = level
+        self.finished = finished if finished is not None else time.time()
+    def row(self):
+        return (self.profile_id, self.score, self.duration, self.character_id,
+                self.seed, self.level, self.finished)
+
+# --- SAVE STORE ---
+# Profiles, unlocked characters and the run history in one SQLite database
+# in WAL mode. Writes, from the UI thread and the ProgressStore writer
+# thread, share one connection and run under `lock`. Reads for the UI
+# (profiles, a profile's progress, the leaderboard) use a second,
+# query-only connection under `read_lock`: with WAL they see the last
+# committed state and never wait for a write in progress. Finished runs
+# are queued with queue_run() and inserted together with the next progress
+# snapshot, in one transaction; the queue has its own lock, so queueing a
+# run on the UI thread never waits for that transaction either.
+class SaveStore(object):
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.runs_lock = threading.Lock()
+        self.pending_runs = []
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # WAL with synchronous=NORMAL stays consistent after a crash and
+        # only fsyncs at checkpoints.
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        with self.lock, self.db:
+            self.db.executescript(SCHEMA)
+            version = self._meta('schema_version')
+            if version is not None and int(version) > SCHEMA_VERSION:
+                raise ValueError(f"save database version {version} is newer than {SCHEMA_VERSION}")
+            self._set_meta('schema_version', SCHEMA_VERSION)
+        self.read_lock = threading.Lock()
+        self.reader = sqlite3.connect(path, check_same_thread=False)
+        self.reader.execute("PRAGMA query_only=ON")
+    def close(self):
+        with self.read_lock:
+            self.reader.close()
+        with self.lock:
+            self.db.close()
+    def _meta(self, key, db=None):
+        row = (db or self.db).execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+    # --- PROFILES ---
+    def profiles(self):
+        with self.read_lock:
+            return self.reader.execute("SELECT id, name FROM profiles ORDER BY id").fetchall()
+    def create_profile(self, name, data=None):
+        # `data` is a progress dict, e.g. migrated from progress.json.
+        data = data or {}
+        with self.lock, self.db:
+            cur = self.db.execute(
+                "INSERT INTO profiles (name, total_coins, selected_character, top_score, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (name, data.get('total_coins', 0), data.get('selected_character_type', 0),
+                 data.get('top_score', 0), time.time()))
+            profile_id = cur.lastrowid
+            unlocked = set(data.get('unlocked_characters', ())) | {0}
+            self.db.executemany("INSERT OR IGNORE INTO unlocks (profile_id, character_id) VALUES (?, ?)",
+                                [(profile_id, c) for c in unlocked])
+        return profile_id
+    def active_profile(self):
+        with self.read_lock:
+            value = self._meta('active_profile', self.reader)
+            if value is not None:
+                row = self.reader.execute("SELECT id FROM profiles WHERE id = ?", (int(value),)).fetchone()
+                if row:
+                    return row[0]
+            row = self.reader.execute("SELECT id FROM profiles ORDER BY id LIMIT 1").fetchone()
+            return row[0] if row else None
+    def set_active_profile(self, profile_id):
+        with self.lock, self.db:
+            self._set_meta('active_profile', profile_id)
+    def migrate(self, load_json):
+        # First open: import the single-player progress.json (via the
+        # ProgressStore loader, with its .tmp/.bak fallbacks) as the first
+        # profile. The JSON files are left in place.
+        if self.profiles():
+            return None
+        data = load_json()
+        profile_id = self.create_profile(DEFAULT_PROFILE, data)
+        with self.lock, self.db:
+            self._set_meta('active_profile', profile_id)
+            self._set_meta('migrated_from_json', int(data is not None))
+        return profile_id
+    # --- PROGRESS ---
+    def load(self, profile_id):
+        with self.read_lock:
+            row = self.reader.execute(
+                "SELECT name, total_coins, selected_character, top_score FROM profiles WHERE id = ?",
+                (profile_id,)).fetchone()
+            if row is None:
+                return None
+            unlocked = set(c for (c,) in self.reader.execute(
+                "SELECT character_id FROM unlocks WHERE profile_id = ?", (profile_id,)))
+        return {
+            'profile_id': profile_id,
+            'name': row[0],
+            'total_coins': row[1],
+            'selected_character_type': row[2],
+            'top_score': row[3],
+            'unlocked_characters': unlocked,
+        }
+    def queue_run(self, run):
+        with self.runs_lock:
+            self.pending_runs.append(run)
+    def write_snapshot(self, data):
+        # ProgressStore writer: progress of one profile plus every queued run.
+        with self.runs_lock:
+            runs = self.pending_runs
+            self.pending_runs = []
+        try:
+            with self.lock, self.db:
+                profile_id = data['profile_id']
+                self.db.execute(
+                    "UPDATE profiles SET total_coins = ?, selected_character = ?, top_score = ? WHERE id = ?",
+                    (data['total_coins'], data['selected_character_type'], data['top_score'], profile_id))
+                self.db.executemany("INSERT OR IGNORE INTO unlocks (profile_id, character_id) VALUES (?, ?)",
+                                    [(profile_id, c) for c in data['unlocked_characters']])
+                if runs:
+                    self.db.executemany(
+                        "INSERT INTO runs (profile_id, score, duration, character_id, seed, level, finished) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [run.row() for run in runs])
+        except Exception:
+            # Rolled back: the runs go first in the next snapshot.
+            with self.runs_lock:
+                self.pending_runs[:0] = runs
+            raise
+    # --- LEADERBOARD ---
+    def leaderboard(self, limit=10, profile_id=None):
+        # [(score, duration, character_id, seed, level, finished, name)]
+        with self.read_lock:
+            if profile_id is None:
+                return self.reader.execute(LEADERBOARD_SQL.format(where=""), (limit,)).fetchall()
+            return self.reader.execute(LEADERBOARD_SQL.format(where="WHERE r.profile_id = ?"),
+                                       (profile_id, limit)).fetchall()
@@ -0,0 +1,43 @@
+from kivy.graphics import Color, Rectangle, Triangle, Ellipse
+
+# --- DRAW TEMPLATES ---
+# Character shapes from the registry compiled once into a list of
+# (rgba, factory) steps. Drawing a character is then a straight run over
+# those steps, with no per-type branching, around the local origin.
+def _rectangle(grow):
+    def make(w, h):
+        return Rectangle(pos=(-grow, -grow), size=(w + 2 * grow, h + 2 * grow))
+    return make
+
+def _triangle(grow):
+    def make(w, h):
+        return Triangle(points=[-grow, -grow, w + grow, -grow, w / 2.0, h + grow])
+    return make
+
+def _ellipse(grow):
+    def make(w, h):
+        return Ellipse(pos=(-grow, -grow), size=(w + 2 * grow, h + 2 * grow))
+    return make
+
+SHAPE_FACTORIES = {
+    'rectangle': _rectangle,
+    'triangle': _triangle,
+    'ellipse': _ellipse,
+}
+
+class DrawTemplate(object):
+    def __init__(self, character):
+        self.character_id = character.id
+        self.steps = [(shape.color, SHAPE_FACTORIES[shape.type](shape.grow)) for shape in character.shapes]
+    def draw(self, canvas, width, height):
+        for rgba, make in self.steps:
+            canvas.add(Color(*rgba))
+            canvas.add(make(width, height))
+
+_templates = {}
+
+def template_for(character):
+    template = _templates.get(character)
+    if template is None:
+        template = _templates[character] = DrawTemplate(character)
+    return template
@@ -0,0 +1,237 @@
+import random
+from entities import EntityPool
+from collision import SortedAxis
+from chunks import ChunkGenerator, ChunkScheduler, OBSTACLE, COIN
+from registry import load_registry
+from instrument import profiler
+
+# Game rules are defined per fixed tick at 60 Hz, which is what the original
+# per-frame constants (gravity, jump velocity, scroll speed) were tuned for.
+TICK_RATE = 60
+TICK = 1.0 / TICK_RATE
+# A long stall (app paused, debugger) is not replayed tick by tick.
+MAX_FRAME_TIME = 0.25
+COLLIDE_SCOPE = profiler.scope('collide')
+SPAWN_SCOPE = profiler.scope('spawn')
+
+# --- PLAYER STATE ---
+class PlayerState(object):
+    __slots__ = ('x', 'width', 'height', 'y', 'prev_y', 'velocity_y', 'lives')
+    def __init__(self, x=100, width=50, height=50):
+        self.x = x
+        self.width = width
+        self.height = height
+        self.y = 0.0
+        self.prev_y = 0.0
+        self.velocity_y = 0.0
+        self.lives = 1
+    def reset(self, lives=1):
+        self.y = 0.0
+        self.prev_y = 0.0
+        self.velocity_y = 0.0
+        self.lives = lives
+    def render_y(self, alpha):
+        return self.prev_y + (self.y - self.prev_y) * alpha
+
+# --- SIMULATION ---
+# Headless game core: physics, spawning and collisions, stepped at a fixed
+# rate and independent of Kivy. RunnerGame feeds it frame times and draws
+# the result; tests and tools can step it directly.
+# Entity x positions are stored in track space (distance from the start of
+# the run), so scrolling is one addition to `scroll` instead of a move per
+# entity; the on-screen x is pool.x[i] - scroll.
+class Simulation(object):
+    def __init__(self, width=800, seed=None, lives=None, level=None, character=None):
+        self.width = width
+        self.player = PlayerState()
+        self.obstacles = EntityPool(40, 40)
+        self.coins = EntityPool(30, 30)
+        self.obstacle_axis = SortedAxis(self.obstacles)
+        self.coin_axis = SortedAxis(self.coins)
+        # Indexed by chunk entity kind.
+        self.axes = (self.obstacle_axis, self.coin_axis)
+        self.scheduler = ChunkScheduler()
+        # Optional callbacks, called from inside step().
+        self.on_coin = None
+        self.on_hit = None
+        self.on_game_over = None
+        # Optional replay writer; every jump() is recorded with its tick.
+        self.recorder = None
+        self.configure(level if level is not None else load_registry().level())
+        self.reset(seed, lives, character)
+    def configure(self, level):
+        # Level rules are copied onto the instance once so step() reads
+        # plain attributes.
+        kinds = {'obstacle': OBSTACLE, 'coin': COIN}
+        rules = []
+        total = 0
+        for rule in level.spawn_table:
+            total += rule.weight
+            rules.append((total, kinds[rule.kind], rule.y_min, rule.y_max,
+                          rule.count_min, rule.count_max))
+        # The chunk worker reads these while it builds a chunk, under the
+        # scheduler lock; it never sees a level half applied.
+        with self.scheduler.lock:
+            self.level = level
+            self.gravity = level.gravity
+            self.jump_velocity = level.jump_velocity
+            self.scroll_speed = level.scroll_speed
+            self.speed_base = level.speed_base
+            self.ramp_start = level.ramp_start
+            self.ramp_rate = level.ramp_rate
+            self.spawn_interval = level.spawn_interval
+            self.lookahead = level.lookahead
+            self.fair_spacing = level.fair_spacing
+            self.buffer_ticks = int(round(level.jump_buffer * TICK_RATE))
+            self.coyote_ticks = int(round(level.coyote_time * TICK_RATE))
+            self.obstacles.width, self.obstacles.height = level.obstacle_size
+            self.coins.width, self.coins.height = level.coin_size
+            self.spawn_rules = rules
+            self.spawn_weight = total
+    def reset(self, seed=None, lives=None, character=None):
+        player = self.player
+        if character is not None:
+            player.width, player.height = character.hitbox
+            if lives is None:
+                lives = character.lives
+        if lives is None:
+            lives = 1
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.seed = seed
+        self.tick = 0
+        self.elapsed_time = 0.0
+        self.speed_multiplier = self.speed_base
+        self.dx = 0.0
+        self.scroll = 0.0
+        self.score = 0
+        self.hits = 0
+        self.game_over = False
+        # Ticks a pressed jump stays pending, and ticks of coyote time left.
+        self.jump_buffer = 0
+        self.coyote = 0
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        player.reset(lives)
+        self.obstacle_axis.clear()
+        self.coin_axis.clear()
+        # The track starts at the right edge of the screen.
+        scheduler = self.scheduler
+        scheduler.reset(ChunkGenerator(self, seed, self.width, TICK_RATE))
+        self.chunk = scheduler.next_chunk()
+        self.chunk_pos = 0
+        self.next_x = self.chunk.xs[0]
+        self.request_chunks()
+    def advance(self, dt, inputs=None, now=0.0):
+        # `inputs` (an InputQueue) is drained tick by tick: the accumulator
+        # left after a tick is how far that tick lies before `now`, and
+        # events timestamped up to then are applied before it.
+        if dt > MAX_FRAME_TIME:
+            dt = MAX_FRAME_TIME
+        self.accumulator += dt
+        steps = 0
+        while self.accumulator >= TICK and not self.game_over:
+            self.accumulator -= TICK
+            if inputs is not None:
+                inputs.apply(self, now - self.accumulator)
+            self.step()
+            steps += 1
+        if self.game_over:
+            self.accumulator = 0.0
+        self.alpha = self.accumulator / TICK
+        return steps
+    def run(self, ticks):
+        for _ in range(ticks):
+            if self.game_over:
+                break
+            self.step()
+    def jump(self):
+        # Takes effect in the next step, or in the first of the following
+        # buffer_ticks steps that starts on the ground.
+        if self.recorder is not None:
+            self.recorder.record_jump(self.tick)
+        self.jump_buffer = self.buffer_ticks + 1
+    def speed_at(self, tick):
+        elapsed = tick * TICK
+        if elapsed > self.ramp_start:
+            return self.speed_base + (elapsed - self.ramp_start) * self.ramp_rate
+        return self.speed_base
+    def step(self):
+        self.tick += 1
+        self.elapsed_time = self.tick * TICK
+        self.speed_multiplier = self.speed_at(self.tick)
+        player = self.player
+        if self.jump_buffer:
+            self.jump_buffer -= 1
+            if player.y == 0 or self.coyote:
+                player.velocity_y = self.jump_velocity
+                self.jump_buffer = 0
+                self.coyote = 0
+        player.prev_y = player.y
+        player.velocity_y += self.gravity
+        y = player.y + player.velocity_y
+        if y < 0:
+            y = 0.0
+            player.velocity_y = 0.0
+        player.y = y
+        if y == 0:
+            self.coyote = self.coyote_ticks
+        elif self.coyote:
+            self.coyote -= 1
+        self.dx = self.scroll_speed * self.speed_multiplier
+        scroll = self.scroll = self.scroll + self.dx
+        with COLLIDE_SCOPE:
+            px = player.x + scroll
+            py = player.y
+            pw = player.width
+            ph = player.height
+            coin_axis = self.coin_axis
+            coin_axis.expire(scroll)
+            for i in coin_axis.collide(px, py, pw, ph):
+                coin_axis.release(i)
+                self.score += 1
+                if self.on_coin is not None:
+                    self.on_coin(self.score)
+            obstacle_axis = self.obstacle_axis
+            obstacle_axis.expire(scroll)
+            for i in obstacle_axis.collide(px, py, pw, ph):
+                self.hits += 1
+                if player.lives > 1:
+                    player.lives -= 1
+                    obstacle_axis.release(i)
+                    if self.on_hit is not None:
+                        self.on_hit(player.lives)
+                elif not self.game_over:
+                    self.game_over = True
+                    if self.on_game_over is not None:
+                        self.on_game_over(self.score)
+        if self.next_x <= scroll + self.width:
+            with SPAWN_SCOPE:
+                self.activate(scroll + self.width)
+    def activate(self, edge):
+        # Spawns every precomputed entity that has reached the right edge.
+        axes = self.axes
+        chunk = self.chunk
+        k = self.chunk_pos
+        while True:
+            if k == chunk.count:
+                chunk = self.scheduler.next_chunk()
+                k = 0
+                self.request_chunks()
+                continue
+            x = chunk.xs[k]
+            if x > edge:
+                break
+            axes[chunk.kinds[k]].spawn(x, chunk.ys[k])
+            k += 1
+        self.chunk = chunk
+        self.chunk_pos = k
+        self.next_x = x
+    def request_chunks(self):
+        # Keep `lookahead` seconds of track, at the current speed, ready.
+        dx = self.dx or self.scroll_speed * self.speed_multiplier
+        self.scheduler.request(self.scroll + self.width + self.lookahead * TICK_RATE * dx)
+    def render_scroll(self):
+        # The view scrolled by dx this tick; backing off by the part of the
+        # tick not yet elapsed blends the previous and current positions.
+        return self.scroll - self.dx * (1.0 - self.alpha)
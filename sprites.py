@@ -0,0 +1,186 @@
+import os
+import math
+import zlib
+import struct
+import hashlib
+from kivy.uix.widget import Widget
+from kivy.graphics import (Fbo, ClearColor, ClearBuffers, Callback, Color, Rectangle,
+                           PushMatrix, PopMatrix, Translate, Scale)
+from kivy.graphics.texture import Texture
+from kivy.graphics.opengl import glBlendFuncSeparate, glBlendFunc, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, GL_ONE
+from kivy.metrics import dp
+from shapes import template_for
+from instrument import log
+
+# Bump when the rendering below changes so cached atlases are rebuilt.
+CACHE_VERSION = 1
+CACHE_MAGIC = b'SPRT'
+CACHE_HEADER = struct.Struct('<4sII')
+# Transparent texels between cells, so sampling never bleeds across.
+PAD = 2
+MAX_ROW_WIDTH = 2048
+
+# --- SPRITE ---
+# One character rasterised into the atlas. The cell covers the hitbox plus
+# `margin` on every side for shapes drawn outside it (grow).
+class Sprite(object):
+    __slots__ = ('texture', 'margin', 'width', 'height')
+    def __init__(self, texture, margin, width, height):
+        self.texture = texture
+        self.margin = margin
+        self.width = width
+        self.height = height
+
+def definition_key(characters, scale):
+    shapes = [(c.id, c.hitbox, [(s.type, s.color, s.grow) for s in c.shapes]) for c in characters]
+    return hashlib.sha256(repr((CACHE_VERSION, scale, shapes)).encode('utf-8')).hexdigest()[:16]
+
+def pack(characters, scale):
+    # Shelf packing: cells left to right, a new row when one is full.
+    cells = []
+    x = y = row_height = width = 0
+    for character in characters:
+        margin = int(math.ceil(max([0] + [s.grow for s in character.shapes]))) + 1
+        w, h = character.hitbox
+        cw = int(math.ceil((w + 2 * margin) * scale))
+        ch = int(math.ceil((h + 2 * margin) * scale))
+        if x and x + cw + PAD > MAX_ROW_WIDTH:
+            x = 0
+            y += row_height + PAD
+            row_height = 0
+        cells.append((x, y, cw, ch, margin))
+        x += cw + PAD
+        row_height = max(row_height, ch)
+        width = max(width, x)
+    return cells, (max(1, width), max(1, y + row_height))
+
+# --- SPRITE ATLAS ---
+# Every character drawn once, through an offscreen Fbo, into one texture.
+# The pixels are cached on disk keyed by the character definitions and the
+# scale (display density), so later starts skip the rendering.
+class SpriteAtlas(object):
+    def __init__(self, characters, scale=None, cache_dir=None):
+        self.scale = scale or max(1.0, dp(1))
+        cells, self.size = pack(characters, self.scale)
+        path = None
+        pixels = None
+        if cache_dir is not None:
+            path = os.path.join(cache_dir, f"sprites-{definition_key(characters, self.scale)}.bin")
+            pixels = self._load(path, cells)
+        if pixels is None:
+            pixels = self._render(characters, cells)
+            if not cells_drawn(pixels, self.size, cells):
+                # Nothing was drawn (no working GL, e.g. the mock backend);
+                # used for this run but never cached.
+                log.warning("Runner: Sprite atlas rendered blank, not caching it")
+            elif path is not None:
+                self._store(path, pixels)
+        self.pixels = pixels
+        self.texture = Texture.create(size=self.size, colorfmt='rgba')
+        self._upload(self.texture)
+        # Re-upload after the GL context is lost (e.g. Android resume).
+        self.texture.add_reload_observer(self._upload)
+        self.sprites = {}
+        for character, (x, y, cw, ch, margin) in zip(characters, cells):
+            self.sprites[character.id] = Sprite(self.texture.get_region(x, y, cw, ch), margin, *character.hitbox)
+    def sprite(self, character):
+        return self.sprites[character.id]
+    def _upload(self, texture):
+        texture.blit_buffer(self.pixels, colorfmt='rgba', bufferfmt='ubyte')
+    def _render(self, characters, cells):
+        fbo = Fbo(size=self.size)
+        # Alpha is accumulated (not multiplied twice) so translucent shapes
+        # keep their coverage; the colour comes out premultiplied.
+        fbo.add(Callback(lambda instr: glBlendFuncSeparate(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA,
+                                                           GL_ONE, GL_ONE_MINUS_SRC_ALPHA)))
+        fbo.add(ClearColor(0, 0, 0, 0))
+        fbo.add(ClearBuffers())
+        for character, (x, y, cw, ch, margin) in zip(characters, cells):
+            fbo.add(PushMatrix())
+            fbo.add(Translate(x + margin * self.scale, y + margin * self.scale))
+            fbo.add(Scale(x=self.scale, y=self.scale, z=1))
+            template_for(character).draw(fbo, *character.hitbox)
+            fbo.add(PopMatrix())
+        fbo.add(Callback(lambda instr: glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)))
+        fbo.draw()
+        return unpremultiply(bytearray(fbo.pixels))
+    def _load(self, path, cells):
+        try:
+            with open(path, 'rb') as f:
+                magic, width, height = CACHE_HEADER.unpack(f.read(CACHE_HEADER.size))
+                if magic != CACHE_MAGIC or (width, height) != tuple(self.size):
+                    return None
+                pixels = zlib.decompress(f.read())
+        except (OSError, struct.error, zlib.error):
+            return None
+        if len(pixels) != 4 * width * height or not cells_drawn(pixels, self.size, cells):
+            return None
+        return pixels
+    def _store(self, path, pixels):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(CACHE_HEADER.pack(CACHE_MAGIC, self.size[0], self.size[1]))
+                f.write(zlib.compress(bytes(pixels)))
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass
+
+def cells_drawn(pixels, size, cells):
+    # Every character has shapes, so each cell needs at least one texel that
+    # is not fully transparent; otherwise the render did not happen.
+    stride = 4 * size[0]
+    for x, y, cw, ch, margin in cells:
+        covered = False
+        for row in range(y, y + ch):
+            start = row * stride + 4 * x + 3
+            alpha = pixels[start:start + 4 * cw:4]
+            if alpha.count(0) < len(alpha):
+                covered = True
+                break
+        if not covered:
+            return False
+    return True
+
+def unpremultiply(pixels):
+    # Straight alpha, which is what Kivy's default blending expects.
+    for k in range(3, len(pixels), 4):
+        a = pixels[k]
+        if 0 < a < 255:
+            pixels[k - 3] = min(255, pixels[k - 3] * 255 // a)
+            pixels[k - 2] = min(255, pixels[k - 2] * 255 // a)
+            pixels[k - 1] = min(255, pixels[k - 1] * 255 // a)
+    return bytes(pixels)
+
+# --- SPRITE WIDGET ---
+# Draws one atlas sprite. The instructions are built once: moving the widget
+# updates a Translate, resizing it a Scale, and changing the sprite only
+# swaps the Rectangle's texture.
+class SpriteWidget(Widget):
+    def __init__(self, sprite=None, **kwargs):
+        super(SpriteWidget, self).__init__(**kwargs)
+        self.sprite = None
+        with self.canvas:
+            PushMatrix()
+            self.translate = Translate(self.x, self.y)
+            self.scale = Scale(x=1, y=1, z=1)
+            Color(1, 1, 1, 1)
+            self.sprite_rect = Rectangle(size=(0, 0))
+            PopMatrix()
+        self.bind(pos=self.update_translate, size=self.update_scale)
+        if sprite is not None:
+            self.set_sprite(sprite)
+    def set_sprite(self, sprite):
+        self.sprite = sprite
+        m = sprite.margin
+        self.sprite_rect.texture = sprite.texture
+        self.sprite_rect.pos = (-m, -m)
+        self.sprite_rect.size = (sprite.width + 2 * m, sprite.height + 2 * m)
+        self.update_scale()
+    def update_translate(self, *args):
+        self.translate.xy = self.pos
+    def update_scale(self, *args):
+        sprite = self.sprite
+        if sprite is not None:
+            self.scale.x = self.width / float(sprite.width)
+            self.scale.y = self.height / float(sprite.height)
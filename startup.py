@@ -0,0 +1,37 @@
+import time
+from contextlib import contextmanager
+
+# --- STARTUP TIMER ---
+# Records named cold-start phases (imports, window creation, progress
+# loading, each screen build, first frame) relative to process start.
+class StartupTimer(object):
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.phases = []
+        self._open = {}
+    def begin(self, name):
+        self._open[name] = time.perf_counter()
+    def end(self, name):
+        start = self._open.pop(name)
+        self.phases.append((name, start - self.t0, time.perf_counter() - start))
+    @contextmanager
+    def phase(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+    def mark(self, name):
+        # A point in time rather than a span, e.g. the first frame.
+        self.phases.append((name, time.perf_counter() - self.t0, 0.0))
+    def report(self):
+        return {
+            'total_ms': (time.perf_counter() - self.t0) * 1000.0,
+            'phases': [{'name': name, 'start_ms': start * 1000.0, 'ms': duration * 1000.0}
+                       for name, start, duration in self.phases],
+        }
+    def format(self):
+        lines = []
+        for name, start, duration in self.phases:
+            lines.append(f"{name:20} at {start * 1000.0:8.1f} ms  took {duration * 1000.0:8.1f} ms")
+        return "\n".join(lines)
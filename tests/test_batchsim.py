@@ -0,0 +1,19 @@
+import pytest
+
+# batchsim is the only module that needs NumPy.
+pytest.importorskip('numpy')
+
+from batchsim import check_parity, BatchSimulator, RandomJump, Reactive
+
+@pytest.mark.parametrize('character_id', [0, 3])
+@pytest.mark.parametrize('policy', [RandomJump(), Reactive()], ids=['random', 'reactive'])
+def test_parity_with_simulation(character_id, policy):
+    assert check_parity(range(12), 1800, policy, character_id=character_id) == 0
+
+def test_batch_is_deterministic():
+    a = BatchSimulator(range(8), rng_seed=5)
+    b = BatchSimulator(range(8), rng_seed=5)
+    a.run(1200, RandomJump())
+    b.run(1200, RandomJump())
+    assert list(a.final_tick) == list(b.final_tick)
+    assert list(a.final_score) == list(b.final_score)
@@ -0,0 +1,92 @@
+import threading
+
+from simulation import Simulation, TICK_RATE
+from chunks import ChunkGenerator, OBSTACLE
+from registry import load_registry
+
+def test_configure_waits_for_chunk_in_progress():
+    # The chunk worker holds the scheduler lock while it builds a chunk
+    # from the level rules; configure() must not change them meanwhile.
+    registry = load_registry()
+    sim = Simulation(seed=1, level=registry.level('default'))
+    storm = registry.level('storm')
+    rules = sim.spawn_rules
+    with sim.scheduler.lock:
+        thread = threading.Thread(target=sim.configure, args=(storm,))
+        thread.start()
+        thread.join(0.2)
+        assert thread.is_alive()
+        assert sim.spawn_rules is rules and sim.level is not storm
+    thread.join()
+    assert sim.level is storm
+    assert sim.spawn_weight == sum(rule.weight for rule in storm.spawn_table)
+    assert sim.spawn_rules[-1][0] == sim.spawn_weight
+
+def obstacle_groups(level_id, seed, chunks=150):
+    # (start, length, per-tick scroll there) of each obstacle group, plus
+    # every x in generation order.
+    sim = Simulation(seed=seed, level=load_registry().level(level_id))
+    generator = ChunkGenerator(sim, seed, sim.width, TICK_RATE)
+    xs = []
+    starts = []
+    width = sim.obstacles.width
+    for _ in range(chunks):
+        chunk = generator.next_chunk()
+        for k in range(chunk.count):
+            x = chunk.xs[k]
+            xs.append(x)
+            if chunk.kinds[k] == OBSTACLE:
+                if starts and x == starts[-1][0] + starts[-1][1]:
+                    starts[-1][1] += width
+                else:
+                    starts.append([x, width])
+    groups = []
+    tick = 0
+    scroll = 0.0
+    dx = sim.scroll_speed * sim.speed_at(0)
+    for x, length in starts:
+        # Per-tick scroll once the player has reached x.
+        while scroll < x - sim.player.x:
+            tick += 1
+            dx = sim.scroll_speed * sim.speed_at(tick)
+            scroll += dx
+        groups.append((x, length, dx))
+    return sim, groups, xs
+
+def jump_profile(level_id):
+    # Measured on a real Simulation: ticks in the air, and ticks spent
+    # above an obstacle's height.
+    sim = Simulation(seed=0, lives=10 ** 9, level=load_registry().level(level_id))
+    sim.jump()
+    sim.step()
+    airtime = 1
+    above = 0
+    while sim.player.y > 0:
+        if sim.player.y > sim.obstacles.height:
+            above += 1
+        sim.step()
+        airtime += 1
+    return airtime, above
+
+def test_fair_groups_clear_with_one_jump():
+    airtime, above = jump_profile('default')
+    for seed in range(10):
+        sim, groups, xs = obstacle_groups('default', seed)
+        pw = sim.player.width
+        # Reaches well into the speed ramp.
+        assert groups[-1][2] > 2 * groups[0][2]
+        for (x, length, dx) in groups:
+            # Ticks during which the group overlaps the player (touching
+            # counts), at the slowest speed it can be passed at.
+            overlap = int((length + pw) // dx) + 1
+            assert overlap <= above, (seed, x, length, dx)
+        for (x0, l0, _), (x1, l1, dx) in zip(groups, groups[1:]):
+            # The player lands before the next group reaches them.
+            assert x1 - (x0 + l0) >= airtime * dx
+
+def test_unfair_chunks_stay_sorted():
+    for seed in range(5):
+        sim, groups, xs = obstacle_groups('storm', seed)
+        assert xs == sorted(xs)
+        # Fair spacing is off: groups overlap and exceed one jump.
+        assert any(b[0] < a[0] + a[1] for a, b in zip(groups, groups[1:]))
@@ -0,0 +1,39 @@
+from entities import EntityPool
+from collision import SortedAxis
+
+def make_axis(xs, y=0.0):
+    axis = SortedAxis(EntityPool(40, 40))
+    ids = [axis.spawn(x, y) for x in xs]
+    return axis, ids
+
+def test_spawns_stay_sorted():
+    axis, ids = make_axis([300, 100, 200, 100])
+    assert axis.keys == [100, 100, 200, 300]
+    assert sorted(axis.ids) == sorted(ids)
+
+def test_expire_releases_entities_left_of_edge():
+    axis, ids = make_axis([0, 50, 100, 200])
+    # Right edges at 40, 90, 140, 240: the first two are past 95.
+    assert axis.expire(95) == 2
+    assert axis.keys == [100, 200]
+    assert axis.pool.count == 2
+    assert not axis.pool.alive[ids[0]] and not axis.pool.alive[ids[1]]
+    assert axis.expire(95) == 0
+
+def test_collide_finds_overlaps_only():
+    axis, ids = make_axis([0, 100, 200, 300])
+    assert axis.collide(120, 0, 50, 50) == [ids[1]]
+    # Touching edges count as a hit.
+    assert sorted(axis.collide(140, 0, 60, 50)) == sorted([ids[1], ids[2]])
+    assert axis.collide(250, 0, 40, 50) == []
+    # Above the entities.
+    assert axis.collide(100, 41, 50, 50) == []
+
+def test_release_then_collide():
+    axis, ids = make_axis([100, 100, 300])
+    axis.release(ids[0])
+    assert axis.collide(100, 0, 10, 10) == [ids[1]]
+    assert axis.pool.count == 2
+    # The freed slot is reused by the next spawn.
+    assert axis.spawn(500, 0) == ids[0]
+    assert axis.keys == [100, 300, 500]
@@ -0,0 +1,67 @@
+from controls import InputQueue
+from simulation import Simulation
+
+class Jumps(object):
+    def __init__(self):
+        self.jumps = 0
+    def jump(self):
+        self.jumps += 1
+
+def airtime():
+    sim = Simulation(seed=1, lives=1000)
+    sim.jump()
+    sim.step()
+    ticks = 0
+    while sim.player.y > 0:
+        sim.step()
+        ticks += 1
+    return ticks
+
+def jumps_on_landing(early):
+    # Presses jump `early` ticks before the player lands, then reports
+    # whether the first tick on the ground jumps again.
+    sim = Simulation(seed=1, lives=1000)
+    sim.jump()
+    sim.step()
+    for _ in range(airtime() - early):
+        sim.step()
+    sim.jump()
+    for _ in range(early):
+        sim.step()
+    assert sim.player.y == 0
+    sim.step()
+    return sim.player.y > 0
+
+def test_jump_buffered_until_landing():
+    buffer_ticks = Simulation(seed=1).buffer_ticks
+    assert buffer_ticks > 0
+    assert jumps_on_landing(1)
+    assert jumps_on_landing(buffer_ticks)
+    assert not jumps_on_landing(buffer_ticks + 1)
+
+def test_presses_in_one_tick_are_one_jump():
+    queue = InputQueue()
+    sim = Jumps()
+    for timestamp in (1.0, 1.2, 1.4, 2.0):
+        queue.push(timestamp=timestamp)
+    queue.apply(sim, 1.5)
+    assert sim.jumps == 1
+    assert queue.coalesced == 2
+    assert len(queue.events) == 1
+    assert [round(ms) for ms in queue.tick_ms] == [500, 300, 100]
+    queue.apply(sim, 1.5)
+    assert sim.jumps == 1
+    queue.apply(sim, 2.0)
+    assert sim.jumps == 2
+    assert queue.coalesced == 2
+
+def test_latency_stats():
+    queue = InputQueue()
+    assert queue.latency() == {'tick_ms': None, 'flip_ms': None}
+    for timestamp in range(20):
+        queue.push(timestamp=float(timestamp))
+        queue.apply(Jumps(), timestamp + 0.001 * (timestamp + 1))
+    mean, p95, worst = queue.latency()['tick_ms']
+    assert round(mean, 6) == 10.5
+    assert round(p95) == 19
+    assert round(worst) == 20
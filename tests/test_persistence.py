@@ -0,0 +1,60 @@
+import json
+import sqlite3
+
+from persistence import ProgressStore, encode
+
+DATA = {'total_coins': 12, 'top_score': 30, 'selected_character_type': 0, 'unlocked_characters': [0]}
+
+def test_round_trip(tmp_path):
+    store = ProgressStore(str(tmp_path / 'progress.json'))
+    store.save(DATA)
+    store.close()
+    assert store.load() == DATA
+
+def test_corrupt_file_falls_back_to_backup(tmp_path):
+    path = tmp_path / 'progress.json'
+    (tmp_path / 'progress.json.bak').write_text(encode(DATA))
+    path.write_text('{"version": 1, "checksum": "0000", "data": {"total_')
+    assert ProgressStore(str(path)).load() == DATA
+
+def test_checksum_mismatch_is_rejected(tmp_path):
+    path = tmp_path / 'progress.json'
+    doc = json.loads(encode(DATA))
+    doc['data']['total_coins'] = 9999
+    path.write_text(json.dumps(doc))
+    assert ProgressStore(str(path)).load(default={}) == {}
+
+def test_nothing_readable_gives_default(tmp_path):
+    path = tmp_path / 'progress.json'
+    path.write_text('not json')
+    (tmp_path / 'progress.json.bak').write_text('[1, 2]')
+    assert ProgressStore(str(path)).load(default={'fresh': True}) == {'fresh': True}
+
+def test_bare_legacy_file_is_accepted(tmp_path):
+    path = tmp_path / 'progress.json'
+    path.write_text(json.dumps(DATA))
+    assert ProgressStore(str(path)).load() == DATA
+
+def failing_writer(data):
+    raise sqlite3.OperationalError("disk I/O error")
+
+def test_failed_flush_goes_to_on_error(tmp_path):
+    store = ProgressStore(str(tmp_path / 'progress.json'), debounce=60, writer=failing_writer)
+    errors = []
+    store.on_error = errors.append
+    store.save(DATA)
+    store.flush()
+    assert len(errors) == 1 and isinstance(errors[0], sqlite3.OperationalError)
+    # close() still joins the worker and finishes.
+    store.save(DATA)
+    store.close()
+    assert len(errors) == 2
+    assert store._thread is None
+
+def test_failed_write_on_worker_goes_to_on_error(tmp_path):
+    store = ProgressStore(str(tmp_path / 'progress.json'), debounce=0, writer=failing_writer)
+    errors = []
+    store.on_error = errors.append
+    store.save(DATA)
+    store.close()
+    assert len(errors) == 1
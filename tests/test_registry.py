@@ -0,0 +1,65 @@
+import copy
+import json
+
+import pytest
+
+import registry
+from registry import parse, load_registry, DEFAULT_PATH
+
+with open(DEFAULT_PATH) as f:
+    DOC = json.load(f)
+
+def doc(**changes):
+    d = copy.deepcopy(DOC)
+    d.update(changes)
+    return d
+
+def test_shipped_data_parses():
+    registry = parse(doc())
+    assert [c.id for c in registry.characters] == sorted(c['id'] for c in DOC['characters'])
+    level = registry.level('default')
+    assert level.spawn_interval == DOC['levels'][0]['spawn']['interval']
+    assert level.fair_spacing
+    assert registry.character(3).lives == 2
+
+def test_unknown_character_falls_back_to_first():
+    registry = parse(doc())
+    assert registry.character(999) is registry.characters[0]
+
+def test_wrong_version_is_rejected():
+    with pytest.raises(ValueError):
+        parse(doc(version=99))
+
+def test_no_characters_is_rejected():
+    with pytest.raises(ValueError):
+        parse(doc(characters=[]))
+
+def test_unknown_shape_type_is_rejected():
+    d = doc()
+    d['characters'][0]['shapes'][0]['type'] = 'hexagon'
+    with pytest.raises(ValueError):
+        parse(d)
+
+def test_unknown_spawn_kind_is_rejected():
+    d = doc()
+    d['levels'][0]['spawn']['table'][0]['kind'] = 'bomb'
+    with pytest.raises(ValueError):
+        parse(d)
+
+def test_level_defaults():
+    d = doc()
+    level = d['levels'][0]
+    del level['jump_buffer'], level['coyote_time'], level['spawn']['lookahead']
+    parsed = parse(d).level(level['id'])
+    assert (parsed.jump_buffer, parsed.coyote_time, parsed.lookahead) == (0.1, 0.08, 3.0)
+
+def test_cache_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, '_loaded', {})
+    first = load_registry(cache_dir=str(tmp_path))
+    assert (tmp_path / 'game_data.json.pickle').exists()
+    # As a new process would: nothing in memory, so the pickle is read.
+    monkeypatch.setattr(registry, '_loaded', {})
+    second = load_registry(cache_dir=str(tmp_path))
+    assert second is not first
+    assert [c.shop_text for c in second.characters] == [c.shop_text for c in first.characters]
+    assert second.level().spawn_interval == first.level().spawn_interval
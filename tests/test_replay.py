@@ -0,0 +1,40 @@
+import random
+
+from simulation import Simulation
+from registry import load_registry
+from replay import ReplayWriter, read_replay, verify_replay
+
+def play(seed, recorder, ticks=3000):
+    # The character's own lives, as in the game: replays do not store them.
+    sim = Simulation(seed=seed, character=load_registry().character(0))
+    sim.recorder = recorder
+    rng = random.Random(1)
+    while not sim.game_over and sim.tick < ticks:
+        if rng.random() < 0.05:
+            sim.jump()
+        sim.step()
+    return sim
+
+def test_replay_round_trip(tmp_path):
+    path = str(tmp_path / 'run.rpl')
+    level = load_registry().level()
+    # A small buffer so the jumps are flushed in several writes.
+    writer = ReplayWriter(path, 7, 0, level.id, 800.0, buffer_size=4)
+    sim = play(7, writer)
+    writer.finish(sim.tick, sim.score, sim.hits)
+    replay = read_replay(path)
+    assert replay.seed == 7
+    assert replay.level_id == level.id
+    assert replay.final == (sim.tick, sim.score, sim.hits)
+    assert len(replay.jumps) > 4
+    result = verify_replay(path)
+    assert result.ok
+    assert result.actual == (sim.tick, sim.score, sim.hits)
+
+def test_abandoned_replay_has_no_footer(tmp_path):
+    path = str(tmp_path / 'run.rpl')
+    writer = ReplayWriter(path, 3, 0, 'default', 800.0)
+    play(3, writer, ticks=300)
+    writer.close()
+    assert read_replay(path).final is None
+    assert not verify_replay(path).ok
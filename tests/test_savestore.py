@@ -0,0 +1,80 @@
+import sqlite3
+import threading
+
+import pytest
+
+from savestore import SaveStore, Run, DEFAULT_PROFILE
+
+def open_store(tmp_path):
+    return SaveStore(str(tmp_path / 'saves.db'))
+
+def test_reads_do_not_wait_for_the_writer(tmp_path):
+    store = open_store(tmp_path)
+    store.migrate(lambda: None)
+    results = []
+    # The writer thread holds `lock` for a whole transaction.
+    with store.lock:
+        reader = threading.Thread(target=lambda: results.append((store.profiles(), store.leaderboard())))
+        reader.start()
+        reader.join(2.0)
+        assert not reader.is_alive()
+    assert results[0][0][0][1] == DEFAULT_PROFILE
+    store.close()
+
+def test_reads_see_committed_writes(tmp_path):
+    store = open_store(tmp_path)
+    profile_id = store.create_profile("Ada")
+    assert store.profiles() == [(profile_id, "Ada")]
+    store.queue_run(Run(profile_id, 40, 12.5, 0, 9, 'default'))
+    store.write_snapshot({'profile_id': profile_id, 'total_coins': 5, 'selected_character_type': 0,
+                          'top_score': 40, 'unlocked_characters': {0}})
+    assert [row[0] for row in store.leaderboard()] == [40]
+    assert store.load(profile_id)['total_coins'] == 5
+    store.close()
+
+def test_migrate_imports_progress_json(tmp_path):
+    store = open_store(tmp_path)
+    legacy = {'total_coins': 77, 'selected_character_type': 2, 'top_score': 310,
+              'unlocked_characters': [2]}
+    profile_id = store.migrate(lambda: legacy)
+    assert store.profiles() == [(profile_id, DEFAULT_PROFILE)]
+    assert store.active_profile() == profile_id
+    data = store.load(profile_id)
+    assert (data['total_coins'], data['selected_character_type'], data['top_score']) == (77, 2, 310)
+    # The free character is always unlocked.
+    assert data['unlocked_characters'] == {0, 2}
+    # Only the first open migrates.
+    assert store.migrate(lambda: legacy) is None
+    assert len(store.profiles()) == 1
+    store.close()
+
+def test_migrate_without_progress_json(tmp_path):
+    store = open_store(tmp_path)
+    profile_id = store.migrate(lambda: None)
+    data = store.load(profile_id)
+    assert (data['name'], data['total_coins'], data['unlocked_characters']) == (DEFAULT_PROFILE, 0, {0})
+    store.close()
+
+def test_failed_snapshot_requeues_runs(tmp_path):
+    store = open_store(tmp_path)
+    profile_id = store.migrate(lambda: None)
+    good = Run(profile_id, 10, 3.0, 0, 1, 'default')
+    # No such profile: the foreign key fails and the transaction rolls back.
+    bad = Run(999, 20, 4.0, 0, 2, 'default')
+    store.queue_run(good)
+    store.queue_run(bad)
+    snapshot = {'profile_id': profile_id, 'total_coins': 50, 'selected_character_type': 0,
+                'top_score': 20, 'unlocked_characters': {0}}
+    with pytest.raises(sqlite3.IntegrityError):
+        store.write_snapshot(snapshot)
+    assert store.leaderboard() == []
+    assert store.load(profile_id)['total_coins'] == 0
+    # Back in the queue, ahead of anything queued since.
+    later = Run(profile_id, 30, 5.0, 0, 3, 'default')
+    store.queue_run(later)
+    assert store.pending_runs == [good, bad, later]
+    store.pending_runs.remove(bad)
+    store.write_snapshot(snapshot)
+    assert [row[0] for row in store.leaderboard()] == [30, 10]
+    assert store.pending_runs == []
+    store.close()
@@ -0,0 +1,36 @@
+import random
+
+from simulation import Simulation
+from registry import load_registry
+
+def drive(sim, ticks=3000, jump_seed=1):
+    rng = random.Random(jump_seed)
+    while not sim.game_over and sim.tick < ticks:
+        if rng.random() < 0.05:
+            sim.jump()
+        sim.step()
+    return sim
+
+def play(seed):
+    return drive(Simulation(seed=seed, lives=3, character=load_registry().character(0)))
+
+def test_same_seed_same_game():
+    a = play(7)
+    b = play(7)
+    assert (a.tick, a.score, a.hits, a.scroll) == (b.tick, b.score, b.hits, b.scroll)
+    assert a.obstacle_axis.keys == b.obstacle_axis.keys
+    assert a.coin_axis.keys == b.coin_axis.keys
+
+def test_seed_changes_track():
+    a = Simulation(seed=1)
+    b = Simulation(seed=2)
+    a.run(600)
+    b.run(600)
+    assert list(a.chunk.xs) != list(b.chunk.xs)
+
+def test_reset_repeats_game():
+    sim = play(11)
+    first = (sim.tick, sim.score, sim.hits)
+    sim.reset(seed=11, lives=3)
+    drive(sim)
+    assert (sim.tick, sim.score, sim.hits) == first